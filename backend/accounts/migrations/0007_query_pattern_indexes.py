@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+# Login, registration and verification look users up by email,
+# which django.contrib.auth does not index. The schema editor writes
+# the vendor's own CREATE/DROP INDEX statements
+USER_EMAIL_INDEX = models.Index(fields=['email'], name='accounts_auth_user_email_idx')
+
+
+def add_user_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), USER_EMAIL_INDEX)
+
+
+def remove_user_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('auth', 'User'), USER_EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_userprofile_first_name_userprofile_last_name_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailverificationcode',
+            index=models.Index(fields=['email', 'is_used', '-created_at'], name='verification_email_used_idx'),
+        ),
+        migrations.RunPython(add_user_email_index, remove_user_email_index),
+    ]
@@ -3,9 +3,12 @@ from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
+import logging
 import random
 import string
 
+logger = logging.getLogger(__name__)
+
 
 class TeacherEmail(models.Model):
     """Model for storing teacher email addresses"""
@@ -111,7 +114,7 @@ def create_user_profile(sender, instance, created, **kwargs):
         # Создаем профиль с определенной ролью
         UserProfile.objects.create(user=instance, role=role)
 
-        print(f"Создан профиль для {instance.username} ({instance.email}) с ролью: {role}")
+        logger.info("Создан профиль для %s (%s) с ролью: %s", instance.username, instance.email, role)
 
 
 @receiver(post_save, sender=User)
@@ -138,6 +141,10 @@ class EmailVerificationCode(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Latest unused code for an email (verification and resend)
+            models.Index(fields=['email', 'is_used', '-created_at'], name='verification_email_used_idx'),
+        ]
 
     def __str__(self):
         return f"Code {self.code} for {self.email}"
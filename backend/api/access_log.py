@@ -0,0 +1,49 @@
+"""
+Структурированный журнал доступа: JSON-строки через неблокирующую очередь
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime, timezone
+
+access_logger = logging.getLogger('api.access')
+
+# Служебные атрибуты LogRecord, которые не попадают в JSON как поля
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в одну JSON-строку вместе с полями из extra"""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладет отформатированные записи в очередь, а в поток их пишет
+    отдельный поток, поэтому медленный stdout не блокирует воркеры.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.listener = logging.handlers.QueueListener(self.queue, logging.StreamHandler(stream))
+        self.listener.start()
+        # При остановке процесса дописываем все, что осталось в очереди
+        atexit.register(self.listener.stop)
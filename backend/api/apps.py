@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Регистрируем сигналы сброса кэша токенов
+        from . import authentication  # noqa: F401
+        # Регистрируем сигналы обновления поискового индекса
+        from . import search  # noqa: F401
@@ -0,0 +1,69 @@
+"""
+Кэшируемая аутентификация по токену для middleware и DRF
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def token_cache_key(key):
+    return f'auth_token:{key}'
+
+
+def resolve_token(key):
+    """Возвращает пару (user, token) по ключу токена или None, если токена нет"""
+    cache_key = token_cache_key(key)
+    resolved = cache.get(cache_key)
+    if resolved is not None:
+        return resolved
+
+    try:
+        token = Token.objects.select_related('user').get(key=key)
+    except Token.DoesNotExist:
+        return None
+
+    resolved = (token.user, token)
+    cache.set(cache_key, resolved, settings.AUTH_TOKEN_CACHE_TTL)
+    return resolved
+
+
+def invalidate_token(key):
+    """Удаляет токен из кэша (выход, обновление токена, изменение пользователя)"""
+    cache.delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, которая берет пользователя из кэша"""
+
+    def authenticate_credentials(self, key):
+        resolved = resolve_token(key)
+        if resolved is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user, token = resolved
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (user, token)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Удаленный токен (например, из админки) больше не должен приниматься"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """В кэше не должна оставаться устаревшая копия пользователя (например, после деактивации)"""
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        invalidate_token(key)
@@ -0,0 +1,186 @@
+"""
+Нагрузочные замеры эндпоинтов API через тестовый клиент Django.
+
+Каждый эндпоинт вызывается несколько раз подряд; по времени ответов
+считаются перцентили, а число SQL-запросов снимается отдельным вызовом,
+чтобы сбор запросов не влиял на замер времени. Результаты сравниваются
+с сохраненным JSON-бейзлайном.
+"""
+
+import statistics
+import time
+from allauth.account.models import EmailAddress
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from campus.cache import data_version, room_statistics_cache_key
+from campus.models import Building, Room
+from events.cache import calendar_cache_key
+from events.models import Event
+from posts.models import Post
+
+BENCHMARK_USERNAME = 'benchmark_user'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+class Endpoint:
+    """
+    Замеряемый запрос; path получает фикстуры и возвращает URL, data - словарь
+    или функция фикстур, вычисляемая при каждом вызове (например, текущий месяц)
+    """
+
+    def __init__(self, name, path, method='get', data=None, authenticated=True, cache_keys=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data or {}
+        self.authenticated = authenticated
+        # Ключи кэша ответа (по фикстурам), удаляемые перед каждым вызовом:
+        # замер "холодного" ответа без сброса остального кэша
+        self.cache_keys = cache_keys
+
+
+def current_month():
+    today = timezone.localdate()
+    return {'year': today.year, 'month': today.month}
+
+
+ENDPOINTS = [
+    Endpoint('posts.feed', lambda f: reverse('api:post-list-create')),
+    Endpoint('posts.comments', lambda f: reverse('api:comment-list-create', args=[f['post'].id])),
+    Endpoint('events.list', lambda f: reverse('api:events:event-list-create')),
+    Endpoint('events.upcoming', lambda f: reverse('api:events:event-list-create'), data={'date': 'upcoming'}),
+    Endpoint('events.detail', lambda f: reverse('api:events:event-detail', args=[f['event'].id])),
+    Endpoint('events.calendar', lambda f: reverse('api:events:calendar-events'), data=lambda f: current_month()),
+    Endpoint(
+        'events.calendar.cold', lambda f: reverse('api:events:calendar-events'), data=lambda f: current_month(),
+        cache_keys=lambda f: [calendar_cache_key(**current_month())]
+    ),
+    Endpoint('campus.buildings', lambda f: reverse('api:campus:building-list')),
+    Endpoint('campus.building_statistics', lambda f: reverse('api:campus:building-statistics', args=[f['building'].id])),
+    Endpoint(
+        'campus.room_statistics.cold',
+        lambda f: reverse('api:campus:room-statistics', args=[f['room'].id]),
+        cache_keys=lambda f: [room_statistics_cache_key(data_version(), f['room'].id)]
+    ),
+    Endpoint('campus.autocomplete', lambda f: reverse('api:campus:autocomplete'), data={'q': '21'}),
+    Endpoint('search', lambda f: reverse('api:search'), data={'q': 'экзамен'}),
+    Endpoint('auth.me', lambda f: reverse('api:current-user')),
+    Endpoint(
+        'auth.login', lambda f: reverse('api:login'), method='post',
+        data={'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD}, authenticated=False
+    ),
+]
+
+
+def prepare_fixtures():
+    """
+    Пользователь для замеров (с паролем, подтвержденным email и токеном)
+    и самые "тяжелые" объекты датасета, на которых замеряются детальные эндпоинты
+    """
+    user, created = User.objects.get_or_create(
+        username=BENCHMARK_USERNAME, defaults={'email': f'{BENCHMARK_USERNAME}@example.com'}
+    )
+    if created or not user.check_password(BENCHMARK_PASSWORD):
+        user.set_password(BENCHMARK_PASSWORD)
+        user.save()
+    EmailAddress.objects.update_or_create(
+        user=user, email=user.email, defaults={'primary': True, 'verified': True}
+    )
+    token, _ = Token.objects.get_or_create(user=user)
+
+    fixtures = {
+        'token': token.key,
+        'post': Post.objects.annotate(total=Count('comments')).order_by('-total').first(),
+        'event': Event.objects.filter(is_public=True).order_by('-participants_count').first(),
+        'building': Building.objects.annotate(total=Count('rooms')).order_by('-total').first(),
+        'room': Room.objects.order_by('-reviews_count').first(),
+    }
+    missing = [name for name, value in fixtures.items() if value is None]
+    if missing:
+        raise ValueError(f'В датасете нет объектов: {", ".join(missing)}')
+    return fixtures
+
+
+def percentile(samples, percent):
+    """Перцентиль с линейной интерполяцией между ближайшими значениями"""
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    return statistics.quantiles(ordered, n=100, method='inclusive')[percent - 1]
+
+
+def call(client, endpoint, url, fixtures):
+    headers = {}
+    if endpoint.authenticated:
+        headers['HTTP_AUTHORIZATION'] = f'Token {fixtures["token"]}'
+    data = endpoint.data(fixtures) if callable(endpoint.data) else endpoint.data
+    return getattr(client, endpoint.method)(url, data, **headers)
+
+
+def reset_cache(endpoint, fixtures):
+    if endpoint.cache_keys is not None:
+        cache.delete_many(endpoint.cache_keys(fixtures))
+
+
+def measure(endpoint, fixtures, iterations, warmup):
+    client = Client()
+    url = endpoint.path(fixtures)
+
+    for _ in range(warmup):
+        call(client, endpoint, url, fixtures)
+
+    timings = []
+    status_code = None
+    for _ in range(iterations):
+        reset_cache(endpoint, fixtures)
+        started = time.perf_counter()
+        response = call(client, endpoint, url, fixtures)
+        timings.append((time.perf_counter() - started) * 1000)
+        status_code = response.status_code
+
+    reset_cache(endpoint, fixtures)
+    with CaptureQueriesContext(connection) as queries:
+        call(client, endpoint, url, fixtures)
+
+    return {
+        'status': status_code,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p90_ms': round(percentile(timings, 90), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': len(queries),
+    }
+
+
+def run(endpoints, iterations=50, warmup=5):
+    fixtures = prepare_fixtures()
+    return {endpoint.name: measure(endpoint, fixtures, iterations, warmup) for endpoint in endpoints}
+
+
+def compare(results, baseline, threshold=1.25, min_delta_ms=1.0):
+    """
+    Регрессии относительно бейзлайна: другой код ответа, рост p50/p99 больше чем
+    в threshold раз (и больше чем на min_delta_ms - быстрые эндпоинты шумят)
+    или рост числа запросов
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if previous.get('status') is not None and result.get('status') != previous['status']:
+            regressions.append(f'{name}: status {previous["status"]} -> {result.get("status")}')
+        for metric in ('p50_ms', 'p99_ms'):
+            before, after = previous[metric], result[metric]
+            if after > before * threshold and after - before > min_delta_ms:
+                regressions.append(f'{name}: {metric} {before:.2f} -> {after:.2f}')
+        if result['queries'] > previous['queries']:
+            regressions.append(f'{name}: queries {previous["queries"]} -> {result["queries"]}')
+    return regressions
@@ -0,0 +1,139 @@
+import json
+import platform
+from pathlib import Path
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from api import benchmark
+
+# Dataset presets passed to generate_load_data
+DATASETS = {
+    'tiny': {'users': 50, 'posts': 500, 'events': 100, 'buildings': 2, 'rooms': 20},
+    'small': {'users': 1000, 'posts': 10000, 'events': 2000, 'buildings': 10, 'rooms': 50},
+    'medium': {'users': 5000, 'posts': 100000, 'events': 10000, 'buildings': 15, 'rooms': 100},
+    'large': {'users': 20000, 'posts': 1000000, 'events': 50000, 'buildings': 20, 'rooms': 200},
+}
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark API endpoints through the Django test client: latency percentiles and query counts, '
+        'compared against a stored JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dataset', choices=DATASETS, default='small',
+            help='Generate this dataset in a throwaway test database before measuring'
+        )
+        parser.add_argument(
+            '--use-existing-db', action='store_true',
+            help='Measure against the configured database (already seeded) instead of a generated test database'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Allow --use-existing-db with DEBUG off; the benchmark user, its token and logins are written there'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only these endpoints (repeatable)')
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument(
+            '--threshold', type=float, default=1.25,
+            help='Fail when p50 or p99 grows by more than this factor'
+        )
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=1.0,
+            help='Ignore latency growth smaller than this (noise on fast endpoints)'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        if options['use_existing_db'] and not settings.DEBUG and not options['force']:
+            raise CommandError(
+                '--use-existing-db writes the benchmark user, its token and logins to the configured database; '
+                'with DEBUG off pass --force to run it anyway'
+            )
+
+        endpoints = benchmark.ENDPOINTS
+        if options['endpoints']:
+            known = {endpoint.name for endpoint in endpoints}
+            unknown = set(options['endpoints']) - known
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}. Known: {", ".join(sorted(known))}')
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name in options['endpoints']]
+
+        # The test client needs the test environment (ALLOWED_HOSTS, locmem email);
+        # it is already set up when the command is called from a test run
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:
+            own_environment = False
+
+        old_name = None
+        try:
+            if not options['use_existing_db']:
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                self.stdout.write(f'Generating the "{options["dataset"]}" dataset...')
+                call_command(
+                    'generate_load_data', seed=options['seed'], stdout=self.stdout,
+                    **DATASETS[options['dataset']]
+                )
+            results = benchmark.run(endpoints, options['iterations'], options['warmup'])
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            if own_environment:
+                teardown_test_environment()
+
+        self.report(results)
+        meta = {
+            'dataset': 'existing' if options['use_existing_db'] else options['dataset'],
+            'seed': options['seed'],
+            'iterations': options['iterations'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'created_at': timezone.now().isoformat(),
+        }
+
+        path = options['baseline']
+        if options['save_baseline']:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({'meta': meta, 'endpoints': results}, indent=2, ensure_ascii=False))
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {path}'))
+            return
+
+        if not path.exists():
+            self.stdout.write(self.style.WARNING(f'No baseline at {path}; run with --save-baseline to create one'))
+            return
+
+        baseline = json.loads(path.read_text())
+        if baseline['meta'].get('dataset') != meta['dataset']:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline was recorded on the "{baseline["meta"].get("dataset")}" dataset, comparing anyway'
+            ))
+        regressions = benchmark.compare(
+            results, baseline['endpoints'], options['threshold'], options['min_delta_ms']
+        )
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {path}'))
+
+    def report(self, results):
+        self.stdout.write(f'{"endpoint":32} {"status":>6} {"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} {"queries":>8}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:32} {result["status"]:>6} {result["p50_ms"]:>9.2f} {result["p90_ms"]:>9.2f} '
+                f'{result["p99_ms"]:>9.2f} {result["queries"]:>8}'
+            )
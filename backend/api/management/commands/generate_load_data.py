@@ -0,0 +1,271 @@
+import random
+import time
+import uuid
+from datetime import datetime, time as day_start, timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import UserProfile
+from api.search import rebuild_index
+from campus.cache import invalidate_autocomplete, invalidate_data
+from campus.models import Building, Room, RoomReview
+from events.cache import invalidate_calendar
+from events.models import Event, EventParticipant, EventReview
+from events.recurrence import WEEKLY
+from posts.models import Comment, Like, Post
+
+USERNAME_PREFIX = 'load_'
+
+FIRST_NAMES = ['Иван', 'Анна', 'Петр', 'Мария', 'Алексей', 'Елена', 'Дмитрий', 'Ольга', 'Сергей', 'Наталья']
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Кузнецов', 'Смирнов', 'Попов', 'Соколов', 'Лебедев', 'Козлов', 'Новиков']
+FACULTIES = ['ИМИТ', 'ИББ', 'МИЭМИС', 'ЮИ', 'ИГН', 'ИХиХФТ']
+WORDS = (
+    'университет студент лекция семинар экзамен зачет сессия расписание аудитория корпус библиотека '
+    'конференция олимпиада стипендия общежитие практика лаборатория проект курсовая диплом преподаватель '
+    'кафедра деканат группа занятие перенос консультация научный клуб волонтеры спорт турнир концерт '
+    'выставка встреча собрание набор запись открыта сегодня завтра неделя вечером утром важно новости'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic synthetic dataset for load testing: users with profiles, '
+        'posts with comments and likes, buildings with rooms and reviews, events with participants'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=3, help='Average comments per post')
+        parser.add_argument('--likes', type=int, default=5, help='Average likes per post')
+        parser.add_argument('--buildings', type=int, default=10)
+        parser.add_argument('--rooms', type=int, default=50, help='Rooms per building')
+        parser.add_argument('--reviews', type=int, default=2, help='Average reviews per room')
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--participants', type=int, default=10, help='Average participants per event')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT transaction')
+        parser.add_argument(
+            '--skip-search-index', action='store_true',
+            help='Do not rebuild the full-text search index afterwards'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('At least one user is required')
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError(
+                f'Users named "{USERNAME_PREFIX}*" already exist; generate into an empty database '
+                '(for example after "manage.py flush")'
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Дни отсчитываются от начала текущих суток: повторный запуск в тот же день дает те же данные
+        self.base = timezone.make_aware(datetime.combine(timezone.localdate(), day_start()))
+        self.totals = {}
+        started = time.monotonic()
+
+        self.stage('users', self.create_users, options['users'])
+        self.stage('posts', self.create_posts, options['posts'], options['comments'], options['likes'])
+        self.stage('campus', self.create_campus, options['buildings'], options['rooms'], options['reviews'])
+        self.stage('events', self.create_events, options['events'], options['participants'])
+
+        # bulk_create не вызывает сигналы: индексы и кэши обновляем сами
+        invalidate_calendar()
+        invalidate_autocomplete()
+        invalidate_data()
+        if not options['skip_search_index']:
+            self.stage('search index', lambda: rebuild_index(batch_size=self.batch_size))
+
+        rows = sum(self.totals.values())
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
+
+    def stage(self, name, function, *args):
+        self.stdout.write(f'Generating {name}...')
+        started = time.monotonic()
+        function(*args)
+        self.stdout.write(f'  done in {time.monotonic() - started:.1f}s')
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def text(self, min_words, max_words):
+        words = self.rng.choices(WORDS, k=self.rng.randint(min_words, max_words))
+        return ' '.join(words).capitalize() + '.'
+
+    def moment(self, min_days, max_days):
+        return self.base + timedelta(minutes=self.rng.randint(min_days * 24 * 60, max_days * 24 * 60))
+
+    def count_around(self, average, upper=None):
+        count = self.rng.randint(0, 2 * average) if average > 0 else 0
+        return count if upper is None else min(count, upper)
+
+    def insert(self, model, objects):
+        if objects:
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+            label = model._meta.label
+            self.totals[label] = self.totals.get(label, 0) + len(objects)
+
+    def batches(self, total):
+        for offset in range(0, total, self.batch_size):
+            yield range(offset, min(offset + self.batch_size, total))
+
+    def create_users(self, total):
+        password = make_password(None)
+        for batch in self.batches(total):
+            users = [
+                User(
+                    username=f'{USERNAME_PREFIX}{i:07d}',
+                    email=f'{USERNAME_PREFIX}{i:07d}@example.com',
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                )
+                for i in batch
+            ]
+            with transaction.atomic():
+                self.insert(User, users)
+
+        self.user_ids = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('username').values_list('id', flat=True)
+        )
+        # Профили обычно создает сигнал post_save, который bulk_create не вызывает
+        profiles = []
+        for user_id in self.user_ids:
+            professor = self.rng.random() < 0.05
+            profiles.append(UserProfile(
+                user_id=user_id,
+                role='professor' if professor else 'student',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                faculty=self.rng.choice(FACULTIES),
+                course=None if professor else self.rng.randint(1, 4),
+            ))
+            if len(profiles) == self.batch_size:
+                with transaction.atomic():
+                    self.insert(UserProfile, profiles)
+                profiles = []
+        with transaction.atomic():
+            self.insert(UserProfile, profiles)
+
+    def create_posts(self, total, comments_average, likes_average):
+        for batch in self.batches(total):
+            posts, comments, likes = [], [], []
+            for _ in batch:
+                created_at = self.moment(-365, 0)
+                likers = self.rng.sample(self.user_ids, self.count_around(likes_average, len(self.user_ids)))
+                post = Post(
+                    id=self.uuid(),
+                    author_id=self.rng.choice(self.user_ids),
+                    content=self.text(5, 60),
+                    created_at=created_at,
+                    # Счетчик сразу совпадает с числом лайков
+                    likes=len(likers),
+                    views=self.rng.randint(len(likers), len(likers) * 10 + 10),
+                )
+                posts.append(post)
+                likes.extend(Like(post_id=post.id, user_id=user_id, created_at=created_at) for user_id in likers)
+                comments.extend(
+                    Comment(
+                        id=self.uuid(),
+                        post_id=post.id,
+                        author_id=self.rng.choice(self.user_ids),
+                        content=self.text(2, 25),
+                        created_at=created_at + timedelta(minutes=self.rng.randint(1, 7 * 24 * 60)),
+                    )
+                    for _ in range(self.count_around(comments_average))
+                )
+            with transaction.atomic():
+                self.insert(Post, posts)
+                self.insert(Comment, comments)
+                self.insert(Like, likes)
+
+    def create_campus(self, buildings_total, rooms_per_building, reviews_average):
+        room_types = [room_type for room_type, _ in Room.ROOM_TYPES]
+        for index in range(buildings_total):
+            floors = self.rng.randint(2, 9)
+            building = Building(
+                id=self.uuid(),
+                name=f'Корпус {index + 1}',
+                address=f'ул. Нагрузочная, {index + 1}',
+                description=self.text(10, 40),
+                floors=floors,
+            )
+            rooms, reviews = [], []
+            for number in range(rooms_per_building):
+                floor = number % floors + 1
+                room = Room(
+                    id=self.uuid(),
+                    building_id=building.id,
+                    number=f'{floor}{number // floors + 1:02d}',
+                    floor=floor,
+                    room_type=self.rng.choice(room_types),
+                    capacity=self.rng.choice([15, 25, 30, 60, 120, 200]),
+                    description=self.text(0, 15),
+                )
+                authors = self.rng.sample(self.user_ids, self.count_around(reviews_average, len(self.user_ids)))
+                ratings = [self.rng.randint(1, 5) for _ in authors]
+                reviews.extend(
+                    RoomReview(id=self.uuid(), room_id=room.id, author_id=author_id, rating=rating, comment=self.text(0, 20))
+                    for author_id, rating in zip(authors, ratings)
+                )
+                # Агрегаты оценок считаем здесь же, сигналы RoomReview не сработают
+                room.rating_sum, room.reviews_count = sum(ratings), len(ratings)
+                room.average_rating = room.rating_sum / room.reviews_count if ratings else 0.0
+                rooms.append(room)
+
+            building.rating_sum = sum(room.rating_sum for room in rooms)
+            building.reviews_count = sum(room.reviews_count for room in rooms)
+            building.average_rating = building.rating_sum / building.reviews_count if building.reviews_count else 0.0
+            with transaction.atomic():
+                self.insert(Building, [building])
+                self.insert(Room, rooms)
+                self.insert(RoomReview, reviews)
+
+    def create_events(self, total, participants_average):
+        categories = [category for category, _ in Event.EVENT_CATEGORIES]
+        for batch in self.batches(total):
+            events, participants, reviews = [], [], []
+            for _ in batch:
+                start = self.moment(-180, 180)
+                capacity = self.rng.choice([None, 20, 50, 100, 300])
+                event = Event(
+                    id=self.uuid(),
+                    title=self.text(2, 6).rstrip('.'),
+                    description=self.text(10, 50),
+                    category=self.rng.choice(categories),
+                    start_datetime=start,
+                    end_datetime=start + timedelta(hours=self.rng.randint(1, 4)),
+                    location=f'Корпус {self.rng.randint(1, 10)}',
+                    organizer_id=self.rng.choice(self.user_ids),
+                    max_participants=capacity,
+                    is_public=self.rng.random() < 0.9,
+                    requires_registration=capacity is not None,
+                )
+                if self.rng.random() < 0.1:
+                    event.recurrence_frequency = WEEKLY
+                    event.recurrence_count = self.rng.randint(4, 16)
+                # save() не вызывается: конец серии и счетчик участников заполняем сами
+                event.series_end = event.compute_series_end()
+
+                attendees = self.rng.sample(
+                    self.user_ids, self.count_around(participants_average, min(len(self.user_ids), capacity or len(self.user_ids)))
+                )
+                event.participants_count = len(attendees)
+                events.append(event)
+                participants.extend(EventParticipant(event_id=event.id, user_id=user_id) for user_id in attendees)
+                if start < self.base:
+                    reviews.extend(
+                        EventReview(id=self.uuid(), event_id=event.id, author_id=user_id, rating=self.rng.randint(1, 5))
+                        for user_id in attendees[:self.count_around(1, len(attendees))]
+                    )
+            with transaction.atomic():
+                self.insert(Event, events)
+                self.insert(EventParticipant, participants)
+                self.insert(EventReview, reviews)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.models import SearchDocument
+from api.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search documents for posts, events, rooms and buildings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type', action='append', dest='kinds', choices=[kind for kind, _ in SearchDocument.KINDS],
+            help='Rebuild only documents of this type (can be repeated)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Documents written per INSERT')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding search index...')
+        totals = rebuild_index(options['kinds'], batch_size=options['batch_size'])
+        for kind, total in totals.items():
+            self.stdout.write(f'  {kind}: {total}')
+        self.stdout.write(self.style.SUCCESS(f'Indexed {sum(totals.values())} document(s)'))
@@ -0,0 +1,39 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from api.replicas import copy_sqlite_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into the SQLite read replicas '
+        '(local stand-in for replication, see DATABASE_REPLICA_URLS)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Repeat every N seconds until interrupted (0 copies once)'
+        )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('The primary database is not SQLite; use the database server replication instead')
+
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if connections[alias].vendor == 'sqlite']
+        if not replicas:
+            raise CommandError('No SQLite replicas configured; set DATABASE_REPLICA_URLS')
+
+        while True:
+            started = time.monotonic()
+            for alias in replicas:
+                copy_sqlite_database(primary.settings_dict['NAME'], connections[alias].settings_dict['NAME'])
+            self.stdout.write(
+                f'Copied {primary.settings_dict["NAME"]} to {", ".join(replicas)} '
+                f'in {(time.monotonic() - started) * 1000:.0f} ms'
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -2,11 +2,21 @@
 Middleware для API аутентификации и безопасности
 """
 
-import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from rest_framework.authtoken.models import Token
-from django.contrib.auth.models import User
+from .access_log import access_logger
+from .authentication import resolve_token
+from .profiling import route_profiler
+from .replicas import SAFE_METHODS, enable_replica_reads, is_pinned, pin_to_primary, replica_reads
+
+logger = logging.getLogger(__name__)
 
 
 class APIAuthMiddleware(MiddlewareMixin):
@@ -57,29 +67,29 @@ class APIAuthMiddleware(MiddlewareMixin):
         # Извлекаем токен
         token_key = auth_header.split(' ')[1]
         
-        try:
-            token = Token.objects.get(key=token_key)
-            user = token.user
-            
-            # Проверяем активность пользователя
-            if not user.is_active:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Аккаунт пользователя деактивирован',
-                    'code': 'USER_INACTIVE'
-                }, status=401)
-            
-            # Добавляем пользователя в request
-            request.user = user
-            request.auth = token
-            
-        except Token.DoesNotExist:
+        # Пользователь берется из общего с DRF кэша токенов
+        resolved = resolve_token(token_key)
+        if resolved is None:
             return JsonResponse({
                 'success': False,
                 'error': 'Недействительный токен',
                 'code': 'INVALID_TOKEN'
             }, status=401)
-        
+
+        user, token = resolved
+
+        # Проверяем активность пользователя
+        if not user.is_active:
+            return JsonResponse({
+                'success': False,
+                'error': 'Аккаунт пользователя деактивирован',
+                'code': 'USER_INACTIVE'
+            }, status=401)
+
+        # Добавляем пользователя в request
+        request.user = user
+        request.auth = token
+
         return None
 
 
@@ -108,6 +118,75 @@ class APIResponseMiddleware(MiddlewareMixin):
         return response
 
 
+class APIProfilingMiddleware:
+    """
+    Middleware для профилирования API: время запроса, время в БД и число
+    запросов в заголовке Server-Timing и в гистограмме по маршрутам.
+    Включается настройкой API_PROFILING_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        # Выключенный профилировщик полностью исключается из цепочки
+        if not settings.API_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with counter.installed():
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+        db_ms = counter.duration * 1000
+
+        response['Server-Timing'] = (
+            f'app;dur={duration_ms:.2f}, '
+            f'db;dur={db_ms:.2f};desc="{counter.count} queries"'
+        )
+
+        match = request.resolver_match
+        if match is not None:
+            route_profiler.record(f'{request.method} /{match.route}', duration_ms, db_ms, counter.count)
+
+        return response
+
+
+class ReadReplicaMiddleware:
+    """
+    Middleware для чтения из реплик БД: безопасные запросы к представлениям
+    из DATABASE_REPLICA_APPS читают из реплик, а клиент после изменяющего
+    запроса на время закрепляется за основной БД.
+    Без DATABASE_REPLICAS полностью исключается из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # По умолчанию (и для всего, что выполняется до представления) - основная БД
+        with replica_reads(False):
+            response = self.get_response(request)
+
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        app_label = view_func.__module__.partition('.')[0]
+        if (
+            request.method in SAFE_METHODS
+            and app_label in settings.DATABASE_REPLICA_APPS
+            and not is_pinned(request)
+        ):
+            enable_replica_reads()
+        return None
+
+
 class APIErrorHandlingMiddleware(MiddlewareMixin):
     """
     Middleware для обработки ошибок API
@@ -121,7 +200,7 @@ class APIErrorHandlingMiddleware(MiddlewareMixin):
             return None
         
         # Логируем ошибку
-        print(f"❌ API Error in {request.path}: {str(exception)}")
+        logger.exception('API Error in %s', request.path)
         
         # Возвращаем стандартизированный ответ об ошибке
         return JsonResponse({
@@ -132,37 +211,65 @@ class APIErrorHandlingMiddleware(MiddlewareMixin):
         }, status=500)
 
 
-class RequestLoggingMiddleware(MiddlewareMixin):
+class QueryCounter:
     """
-    Middleware для логирования API запросов
+    Считает SQL-запросы и время, проведенное в БД, через execute_wrapper
     """
-    
-    def process_request(self, request):
-        """Логирует входящие API запросы"""
-        
-        # Логируем только API endpoints
-        if not request.path.startswith('/api/'):
-            return None
-        
-        # Получаем информацию о пользователе
-        user_info = "Anonymous"
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            user_info = f"User: {request.user.username}"
-        
-        # Логируем запрос
-        print(f"📡 API Request: {request.method} {request.path} - {user_info}")
-        
-        return None
-    
-    def process_response(self, request, response):
-        """Логирует ответы API"""
-        
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+    @contextmanager
+    def installed(self):
+        """Подключает счетчик ко всем соединениям на время блока"""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+class RequestLoggingMiddleware:
+    """
+    Middleware для журнала доступа к API: одна JSON-строка на запрос
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
         # Логируем только API endpoints
         if not request.path.startswith('/api/'):
-            return response
-        
-        # Логируем ответ
-        status_text = "OK" if 200 <= response.status_code < 300 else "ERROR"
-        print(f"{status_text} API Response: {request.method} {request.path} - {response.status_code}")
-        
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with counter.installed():
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        # Ошибки сервера пишем всегда, остальные запросы - с заданной долей
+        if response.status_code >= 500 or random.random() < settings.ACCESS_LOG_SAMPLE_RATE:
+            user = getattr(request, 'user', None)
+            access_logger.info(
+                '%s %s %s', request.method, request.path, response.status_code,
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'user_id': user.pk if user is not None and user.is_authenticated else None,
+                    'duration_ms': round(duration * 1000, 2),
+                    'db_queries': counter.count,
+                    'db_duration_ms': round(counter.duration * 1000, 2),
+                }
+            )
+
         return response
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:50
+
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    # External-content FTS5 table: the text lives only in api_searchdocument
+    """
+    CREATE VIRTUAL TABLE api_searchdocument_fts USING fts5(
+        title, body,
+        content='api_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Ranking behind the hidden "rank" column: the title weighs more than the body.
+    # ORDER BY rank lets FTS5 sort matches without calling bm25() per row from SQL
+    "INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0)')",
+    """
+    CREATE TRIGGER api_searchdocument_fts_insert AFTER INSERT ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER api_searchdocument_fts_delete AFTER DELETE ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER api_searchdocument_fts_update AFTER UPDATE ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO api_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS api_searchdocument_fts_update',
+    'DROP TRIGGER IF EXISTS api_searchdocument_fts_delete',
+    'DROP TRIGGER IF EXISTS api_searchdocument_fts_insert',
+    'DROP TABLE IF EXISTS api_searchdocument_fts',
+]
+
+# Must match SEARCH_VECTOR in api/search.py for the planner to use the index
+POSTGRESQL_FORWARD = [
+    """
+    CREATE INDEX api_searchdocument_vector_idx ON api_searchdocument USING GIN ((
+        setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')
+    ))
+    """,
+]
+
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS api_searchdocument_vector_idx',
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('event', 'Event'), ('room', 'Room'), ('building', 'Building')], max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('title', models.CharField(blank=True, max_length=300)),
+                ('body', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_for_vendor({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
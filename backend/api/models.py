@@ -1,3 +1,33 @@
 from django.db import models
 
-# Create your models here.
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of a post, event, room or building.
+
+    The full-text index over title and body is maintained by the database:
+    an FTS5 table with triggers on SQLite, a GIN tsvector index on PostgreSQL
+    (see migration 0001 and api/search.py).
+    """
+    POST = 'post'
+    EVENT = 'event'
+    ROOM = 'room'
+    BUILDING = 'building'
+    KINDS = [
+        (POST, 'Post'),
+        (EVENT, 'Event'),
+        (ROOM, 'Room'),
+        (BUILDING, 'Building'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.UUIDField()
+    title = models.CharField(max_length=300, blank=True)
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
@@ -0,0 +1,152 @@
+"""
+Пагинация по ключу (keyset) для лент с сортировкой по времени создания
+"""
+
+from base64 import b64decode, b64encode
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по паре (поле времени, id) без OFFSET и COUNT(*).
+
+    Курсор хранит ключ последнего элемента страницы, поэтому любая
+    страница стоит столько же, сколько первая.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор'
+
+    # Поля ключа: первое - время, второе - уникальный id
+    ordering = ('-created_at', '-id')
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        time_field, id_field = (field.lstrip('-') for field in self.ordering)
+        descending = self.ordering[0].startswith('-')
+        lookup = 'lt' if descending else 'gt'
+
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = self.decode_cursor(request, queryset.model._meta.get_field(id_field))
+        if cursor is not None:
+            position, last_id = cursor
+            queryset = queryset.filter(
+                Q(**{f'{time_field}__{lookup}': position}) |
+                Q(**{time_field: position, f'{id_field}__{lookup}': last_id})
+            )
+
+        # Берем на один элемент больше, чтобы узнать, есть ли следующая страница
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        self.next_position = None
+        if self.has_next:
+            last = results[-1]
+            self.next_position = (getattr(last, time_field), getattr(last, id_field))
+        return results
+
+    def decode_cursor(self, request, id_model_field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw_position, raw_id = b64decode(encoded.encode('ascii')).decode('utf-8').split('|', 1)
+            position = parse_datetime(raw_position)
+            last_id = id_model_field.to_python(raw_id)
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if position is None or last_id is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position, last_id
+
+    def encode_cursor(self, position, last_id):
+        raw = f'{position.isoformat()}|{last_id}'
+        encoded = b64encode(raw.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(*self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+
+class RankedPagination(KeysetPagination):
+    """
+    Постраничная выдача результатов, упорядоченных по релевантности.
+
+    Ключ у релевантности нет, поэтому страницы берутся по номеру, но без
+    COUNT(*): как и в KeysetPagination, запрашивается на один элемент больше.
+    Глубина ограничена max_page - дальше релевантных результатов не бывает.
+    """
+
+    page_query_param = 'page'
+    max_page = 50
+    invalid_page_message = 'Неверный номер страницы'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        try:
+            self.page = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if not 1 <= self.page <= self.max_page:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.page - 1) * self.page_size
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.has_next = len(results) > self.page_size and self.page < self.max_page
+        return results[:self.page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return replace_query_param(url, self.page_query_param, self.page + 1)
@@ -0,0 +1,66 @@
+"""
+Сбор статистики времени ответа по маршрутам API
+"""
+
+import threading
+from bisect import bisect_left
+
+# Верхние границы корзин гистограммы в миллисекундах
+BUCKET_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class RouteStats:
+    """Накопленная статистика одного маршрута"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.db_ms = 0.0
+        self.db_queries = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, duration_ms, db_ms, db_queries):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.db_ms += db_ms
+        self.db_queries += db_queries
+        self.buckets[bisect_left(BUCKET_BOUNDS_MS, duration_ms)] += 1
+
+    def as_dict(self):
+        labels = [f'<={bound}ms' for bound in BUCKET_BOUNDS_MS] + [f'>{BUCKET_BOUNDS_MS[-1]}ms']
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 2),
+            'max_ms': round(self.max_ms, 2),
+            'avg_db_ms': round(self.db_ms / self.count, 2),
+            'avg_db_queries': round(self.db_queries / self.count, 2),
+            'histogram': dict(zip(labels, self.buckets)),
+        }
+
+
+class RouteProfiler:
+    """Потокобезопасное хранилище статистики по маршрутам в памяти процесса"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, duration_ms, db_ms, db_queries):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.add(duration_ms, db_ms, db_queries)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: stats.as_dict() for route, stats in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_profiler = RouteProfiler()
@@ -0,0 +1,110 @@
+"""
+Чтение из реплик БД.
+
+Безопасные запросы (GET, HEAD, OPTIONS) к представлениям приложений из
+DATABASE_REPLICA_APPS читают данные из реплик (DATABASE_REPLICAS), все
+записи и остальные запросы идут в основную БД. Клиент, который только что
+что-то изменил, на DATABASE_REPLICA_PIN_SECONDS закрепляется за основной БД
+и сразу видит свои изменения, даже если реплика отстает.
+"""
+
+import hashlib
+import random
+import sqlite3
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Всегда читаются из основной БД: токен, пользователь, его профиль и сессия
+# нужны сразу после входа и регистрации, отставание реплики здесь недопустимо.
+# Запросы входа и регистрации идут без учетных данных, поэтому выданный
+# ими токен не закреплен за основной БД (см. pin_cache_key)
+PRIMARY_ONLY_APPS = {'auth', 'authtoken', 'sessions', 'account', 'accounts'}
+
+# Можно ли текущему запросу читать из реплик
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def enable_replica_reads():
+    """Разрешает чтение из реплик до конца текущего блока replica_reads()"""
+    _replica_reads.set(True)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def pin_cache_key(request):
+    """Ключ закрепления клиента: по токену из заголовка или по cookie сессии"""
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if auth_header.startswith('Token '):
+        credential = auth_header[len('Token '):]
+    else:
+        credential = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    # В ключе кэша не храним сам токен
+    return f'replica_pin:{hashlib.sha256(credential.encode()).hexdigest()}'
+
+
+def pin_to_primary(request):
+    key = pin_cache_key(request)
+    if key is not None:
+        cache.set(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(request):
+    key = pin_cache_key(request)
+    return key is not None and cache.get(key, False)
+
+
+class ReplicaRouter:
+    """
+    Роутер БД: чтение из случайной реплики внутри replica_reads(),
+    запись всегда в основную БД
+    """
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not _replica_reads.get():
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        # После записи запрос дочитывает данные из основной БД, где они уже есть
+        if _replica_reads.get():
+            _replica_reads.set(False)
+        # Объект, прочитанный из реплики, тоже сохраняется в основную БД
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной БД, связи между их объектами допустимы
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит из основной БД вместе с данными
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def copy_sqlite_database(source, target):
+    """
+    Копирует SQLite-файл через backup API: согласованный снимок,
+    основная БД при этом остается доступной для записи
+    """
+    with closing(sqlite3.connect(source)) as source_connection, closing(sqlite3.connect(target)) as target_connection:
+        source_connection.backup(target_connection)
@@ -0,0 +1,255 @@
+"""
+Единый полнотекстовый поиск по постам, событиям, аудиториям и корпусам.
+
+Текст объектов хранится в SearchDocument и обновляется сигналами при
+сохранении и удалении. Обратный индекс ведет сама БД: FTS5 в SQLite
+(ранжирование bm25), GIN-индекс по tsvector в PostgreSQL (ts_rank_cd).
+Для остальных СУБД остается медленный поиск по icontains.
+"""
+
+import re
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from campus.models import Building, Room
+from events.models import Event
+from posts.models import Post
+from .models import SearchDocument
+
+# Больше слов в запросе не учитываем: каждое слово - отдельный проход по индексу
+MAX_QUERY_TERMS = 8
+
+# То же выражение, что и в индексе api_searchdocument_vector_idx (миграция 0001)
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', d.title), 'A') || setweight(to_tsvector('simple', d.body), 'B')"
+)
+
+TERM_PATTERN = re.compile(r'\w+')
+
+# Поля, изменение которых требует переиндексации
+INDEXED_FIELDS = {
+    Post: {'content'},
+    Event: {'title', 'description', 'location', 'is_public'},
+    Room: {'number', 'description', 'building'},
+    Building: {'name', 'address', 'description'},
+}
+
+
+def normalize(text):
+    """unicode61 не сводит ё к е, поэтому делаем это сами для документов и запросов"""
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def query_terms(query):
+    return TERM_PATTERN.findall(normalize(query).lower())[:MAX_QUERY_TERMS]
+
+
+def post_document(post):
+    return SearchDocument.POST, '', post.content, post.created_at
+
+
+def event_document(event):
+    if not event.is_public:
+        return None
+    body = '\n'.join(part for part in (event.description, event.location) if part)
+    return SearchDocument.EVENT, event.title, body, event.created_at
+
+
+def room_document(room):
+    title = f'{room.number} {room.building.name}'
+    return SearchDocument.ROOM, title, room.description, room.created_at
+
+
+def building_document(building):
+    body = '\n'.join(part for part in (building.address, building.description) if part)
+    return SearchDocument.BUILDING, building.name, body, building.created_at
+
+
+DOCUMENT_BUILDERS = {
+    Post: post_document,
+    Event: event_document,
+    Room: room_document,
+    Building: building_document,
+}
+
+KIND_MODELS = {
+    SearchDocument.POST: Post,
+    SearchDocument.EVENT: Event,
+    SearchDocument.ROOM: Room,
+    SearchDocument.BUILDING: Building,
+}
+
+
+def build_document(instance):
+    """Несохраненный SearchDocument для объекта или None, если объект не ищется"""
+    document = DOCUMENT_BUILDERS[type(instance)](instance)
+    if document is None:
+        return None
+    kind, title, body, created_at = document
+    return SearchDocument(
+        kind=kind,
+        object_id=instance.pk,
+        title=normalize(title)[:300],
+        body=normalize(body),
+        created_at=created_at,
+    )
+
+
+def index_object(instance):
+    document = build_document(instance)
+    if document is None:
+        remove_object(instance)
+        return
+    SearchDocument.objects.update_or_create(
+        kind=document.kind,
+        object_id=document.object_id,
+        defaults={'title': document.title, 'body': document.body, 'created_at': document.created_at},
+    )
+
+
+def remove_object(instance):
+    kind = next(kind for kind, model in KIND_MODELS.items() if model is type(instance))
+    SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def rebuild_index(kinds=None, batch_size=1000):
+    """Пересоздает документы выбранных типов пачками; возвращает число документов по типам"""
+    totals = {}
+    for kind, model in KIND_MODELS.items():
+        if kinds and kind not in kinds:
+            continue
+
+        queryset = model.objects.order_by('pk')
+        if model is Room:
+            queryset = queryset.select_related('building')
+
+        # Поиск по типу не остается пустым или неполным во время пересборки
+        # и после ее ошибки: удаление и вставка видны только вместе
+        with transaction.atomic():
+            SearchDocument.objects.filter(kind=kind).delete()
+            totals[kind] = 0
+            batch = []
+            for instance in queryset.iterator(chunk_size=batch_size):
+                document = build_document(instance)
+                if document is not None:
+                    batch.append(document)
+                if len(batch) == batch_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    totals[kind] += len(batch)
+                    batch = []
+            SearchDocument.objects.bulk_create(batch)
+            totals[kind] += len(batch)
+    return totals
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Building)
+def index_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not INDEXED_FIELDS[sender] & set(update_fields):
+        return
+    index_object(instance)
+
+    # Название корпуса входит в документы его аудиторий
+    if sender is Building and not kwargs.get('created'):
+        for room in instance.rooms.select_related('building'):
+            index_object(room)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=Building)
+def remove_on_delete(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+def sqlite_search(terms, kinds, limit, offset):
+    # Все слова обязательны, последнее - префикс: "ауд 21" находит "аудитория 214".
+    # rank - bm25 с весами из миграции 0001: чем меньше, тем лучше совпадение
+    match = ' '.join(f'"{term}"' for term in terms) + '*'
+    if not kinds:
+        # Без фильтра FTS5 сам отбирает лучшую страницу, документы читаются только для нее
+        sql = """
+            SELECT d.id, d.kind, d.object_id, d.title, d.body, d.created_at, -page.rank AS rank
+            FROM (
+                SELECT rowid, rank FROM api_searchdocument_fts
+                WHERE api_searchdocument_fts MATCH %s
+                ORDER BY rank, rowid
+                LIMIT %s OFFSET %s
+            ) page
+            JOIN api_searchdocument d ON d.id = page.rowid
+            ORDER BY page.rank, d.id
+        """
+        return list(SearchDocument.objects.raw(sql, [match, limit, offset]))
+
+    kind_filter, params = kinds_sql(kinds)
+    sql = f"""
+        SELECT d.id, d.kind, d.object_id, d.title, d.body, d.created_at, -api_searchdocument_fts.rank AS rank
+        FROM api_searchdocument_fts
+        JOIN api_searchdocument d ON d.id = api_searchdocument_fts.rowid
+        WHERE api_searchdocument_fts MATCH %s {kind_filter}
+        ORDER BY api_searchdocument_fts.rank, d.id
+        LIMIT %s OFFSET %s
+    """
+    return list(SearchDocument.objects.raw(sql, [match, *params, limit, offset]))
+
+
+def postgresql_search(terms, kinds, limit, offset):
+    tsquery = ' & '.join(terms) + ':*'
+    kind_filter, params = kinds_sql(kinds)
+    sql = f"""
+        SELECT d.id, d.kind, d.object_id, d.title, d.body, d.created_at,
+               ts_rank_cd({SEARCH_VECTOR}, query) AS rank
+        FROM api_searchdocument d, to_tsquery('simple', %s) query
+        WHERE {SEARCH_VECTOR} @@ query {kind_filter}
+        ORDER BY rank DESC, d.id
+        LIMIT %s OFFSET %s
+    """
+    return list(SearchDocument.objects.raw(sql, [tsquery, *params, limit, offset]))
+
+
+def fallback_search(terms, kinds, limit, offset):
+    queryset = SearchDocument.objects.annotate(rank=Value(0.0)).order_by('-created_at', '-id')
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+    return list(queryset[offset:offset + limit])
+
+
+SEARCH_BACKENDS = {
+    'sqlite': sqlite_search,
+    'postgresql': postgresql_search,
+}
+
+
+def kinds_sql(kinds):
+    if not kinds:
+        return '', []
+    placeholders = ', '.join(['%s'] * len(kinds))
+    return f'AND d.kind IN ({placeholders})', list(kinds)
+
+
+class SearchResults:
+    """
+    Результаты поиска, которые читаются срезами: каждый срез - один запрос
+    с LIMIT/OFFSET, поэтому пагинатор не считает все совпадения.
+    """
+
+    def __init__(self, query, kinds=None):
+        self.terms = query_terms(query)
+        self.kinds = list(kinds or [])
+
+    def __getitem__(self, page):
+        if not isinstance(page, slice) or page.step is not None:
+            raise TypeError('SearchResults поддерживает только срезы без шага')
+        offset = page.start or 0
+        limit = page.stop - offset
+        if not self.terms or limit <= 0:
+            return []
+
+        search = SEARCH_BACKENDS.get(connection.vendor, fallback_search)
+        return search(self.terms, self.kinds, limit, offset)
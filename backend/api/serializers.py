@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from posts.models import Post, Comment, Like
 from accounts.models import UserProfile
+from .models import SearchDocument
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -63,10 +64,25 @@ class PostSerializer(serializers.ModelSerializer):
     def get_is_liked(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            # Лента аннотирует лайк текущего пользователя в основном запросе
+            if hasattr(obj, 'liked_by_user'):
+                return obj.liked_by_user
             return Like.objects.filter(post=obj, user=request.user).exists()
         return False
 
 
+class PostFeedSerializer(PostSerializer):
+    """Представление поста в ленте: только последние комментарии"""
+    latest_comments = CommentSerializer(many=True, read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = [
+            'id', 'author', 'content', 'image', 'created_at',
+            'updated_at', 'likes', 'views', 'latest_comments',
+            'comments_count', 'is_liked'
+        ]
+
+
 class PostCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
@@ -91,3 +107,23 @@ class CommentCreateSerializer(serializers.ModelSerializer):
         validated_data['author'] = self.context['request'].user
         validated_data['post'] = self.context['post']
         return super().create(validated_data)
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    """Найденный объект: тип, id исходного объекта и фрагмент текста"""
+    type = serializers.CharField(source='kind')
+    id = serializers.UUIDField(source='object_id')
+    excerpt = serializers.SerializerMethodField()
+    rank = serializers.FloatField()
+
+    # Длина фрагмента текста в выдаче
+    EXCERPT_LENGTH = 200
+
+    class Meta:
+        model = SearchDocument
+        fields = ['type', 'id', 'title', 'excerpt', 'rank', 'created_at']
+
+    def get_excerpt(self, obj):
+        if len(obj.body) <= self.EXCERPT_LENGTH:
+            return obj.body
+        return obj.body[:self.EXCERPT_LENGTH].rsplit(' ', 1)[0] + '…'
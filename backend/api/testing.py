@@ -0,0 +1,94 @@
+"""
+Проверка планов запросов в тестах: эндпоинт не должен читать таблицы целиком
+"""
+
+import json
+import re
+from contextlib import contextmanager
+from unittest import SkipTest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# SQLite: "SCAN events_event" и "SCAN events_event USING [COVERING] INDEX ..." - обход всей таблицы
+# или всего индекса; поиск по условию на индекс выглядит как "SEARCH ... USING INDEX ... (col=?)"
+SQLITE_FULL_SCAN = re.compile(
+    r'^SCAN (?P<table>\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (?P<index>\w+))?$'
+)
+
+
+def sqlite_full_scans(cursor, sql):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+    scans = []
+    for row in cursor.fetchall():
+        match = SQLITE_FULL_SCAN.match(row[-1])
+        if match:
+            scans.append((match.group('table'), match.group('index')))
+    return scans
+
+
+def postgresql_full_scans(cursor, sql):
+    # На маленьких тестовых таблицах планировщик всегда выбирает Seq Scan,
+    # поэтому запрещаем его: если он остался, подходящего индекса нет
+    cursor.execute('SET LOCAL enable_seqscan = off')
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            scans.append((node['Relation Name'], None))
+        elif node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node:
+            # Обход индекса целиком (ради порядка строк) - тоже чтение всей таблицы
+            scans.append((node['Relation Name'], node['Index Name']))
+        nodes.extend(node.get('Plans', []))
+    return scans
+
+
+PLAN_INSPECTORS = {
+    'sqlite': sqlite_full_scans,
+    'postgresql': postgresql_full_scans,
+}
+
+
+def full_table_scans(sql):
+    """
+    Пары (таблица, индекс или None), которые запрос читает целиком
+    (производные таблицы подзапросов не в счет)
+    """
+    tables = set(connection.introspection.table_names())
+    with connection.cursor() as cursor:
+        return [scan for scan in PLAN_INSPECTORS[connection.vendor](cursor, sql) if scan[0] in tables]
+
+
+class QueryPlanAssertionsMixin:
+    """
+    Добавляет в TestCase assertNoFullTableScans: все SELECT, выполненные внутри
+    блока, прогоняются через EXPLAIN, и тест падает, если какой-то из них
+    читает таблицу целиком - без индекса или обходя весь индекс. Законные
+    обходы перечисляются в allow: имя индекса разрешает упорядоченный обход
+    по нему (например, лента с LIMIT), имя таблицы - любой обход таблицы.
+    """
+
+    @contextmanager
+    def assertNoFullTableScans(self, allow=()):
+        if connection.vendor not in PLAN_INSPECTORS:
+            raise SkipTest(f'EXPLAIN проверка не поддерживается для {connection.vendor}')
+
+        with CaptureQueriesContext(connection) as captured:
+            yield
+
+        problems = []
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            for table, index in full_table_scans(sql):
+                if table not in allow and index not in allow:
+                    problems.append(f'{table} ({index or "без индекса"}): {sql}')
+
+        if problems:
+            self.fail('Полное сканирование таблиц:\n' + '\n'.join(problems))
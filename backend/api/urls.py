@@ -10,6 +10,9 @@ urlpatterns = [
     # Test endpoint
     path('test/', views.test_api, name='test-api'),
 
+    # Profiling statistics (staff only)
+    path('profiling/', views.profiling_stats, name='profiling-stats'),
+
     # Role checking
     path('auth/check-role/', views.check_user_role, name='check-user-role'),
 
@@ -40,6 +43,9 @@ urlpatterns = [
     # Comments
     path('posts/<uuid:post_id>/comments/', views.CommentListCreateView.as_view(), name='comment-list-create'),
 
+    # Search
+    path('search/', views.SearchView.as_view(), name='search'),
+
     # User Profile
     path('profile/', views.UserProfileView.as_view(), name='user-profile'),
     path('users/<int:pk>/', views.UserDetailView.as_view(), name='user-detail'),
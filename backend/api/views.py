@@ -1,4 +1,5 @@
-from rest_framework import generics, status, permissions
+import logging
+from rest_framework import exceptions, generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
@@ -9,15 +10,25 @@ from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.template.loader import render_to_string
 from allauth.account.models import EmailAddress
 from posts.models import Post, Comment, Like
+from posts.view_counter import view_counter
 from accounts.models import UserProfile, EmailVerificationCode
+from .authentication import invalidate_token
+from .models import SearchDocument
+from .pagination import KeysetPagination, RankedPagination
+from .profiling import route_profiler
+from .search import SearchResults
 from .serializers import (
-    PostSerializer, PostCreateSerializer, CommentSerializer,
-    CommentCreateSerializer, UserSerializer, UserProfileSerializer
+    PostSerializer, PostFeedSerializer, PostCreateSerializer, CommentSerializer,
+    CommentCreateSerializer, UserSerializer, UserProfileSerializer, SearchResultSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 
 def send_verification_code(email, user=None):
     """Отправляет код верификации на email через Django email backend"""
@@ -53,11 +64,11 @@ def send_verification_code(email, user=None):
             fail_silently=False,
         )
 
-        print(f"📧 Код верификации {verification_code.code} отправлен на {email}")
+        logger.info("Код верификации %s отправлен на %s", verification_code.code, email)
         return verification_code
 
     except Exception as e:
-        print(f"❌ Ошибка отправки кода: {str(e)}")
+        logger.exception("Ошибка отправки кода")
         raise e
 
 
@@ -130,7 +141,7 @@ def login_view(request):
     # Создаем или получаем токен
     token, created = Token.objects.get_or_create(user=user)
 
-    print(f"✅ Пользователь {user.username} успешно вошел в систему")
+    logger.info("Пользователь %s успешно вошел в систему", user.username)
 
     return Response({
         'success': True,
@@ -187,7 +198,9 @@ def api_root(request):
                 'room_reviews': '/api/campus/rooms/{id}/reviews/',
                 'building_stats': '/api/campus/buildings/{id}/statistics/',
                 'room_stats': '/api/campus/rooms/{id}/statistics/',
+                'autocomplete': '/api/campus/autocomplete/?q={query}',
             },
+            'search': '/api/search/?q={query}&type={post,event,room,building}',
             'test': '/api/test/',
         },
         'documentation': {
@@ -214,6 +227,20 @@ def test_api(request):
     })
 
 
+@api_view(['GET', 'DELETE'])
+@permission_classes([permissions.IsAdminUser])
+def profiling_stats(request):
+    """Гистограммы времени ответа по маршрутам API (для операторов)"""
+    if request.method == 'DELETE':
+        route_profiler.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    return Response({
+        'enabled': settings.API_PROFILING_ENABLED,
+        'routes': route_profiler.snapshot()
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def check_user_role(request):
@@ -276,7 +303,7 @@ def send_email_code(request):
         # Отправляем код верификации
         verification_code = send_verification_code(email)
 
-        print(f"📧 Код верификации отправлен на: {email}")
+        logger.info("Код верификации отправлен на: %s", email)
 
         return Response({
             'message': 'Код подтверждения отправлен на ваш email',
@@ -285,7 +312,7 @@ def send_email_code(request):
         })
 
     except Exception as e:
-        print(f"❌ Ошибка при отправке кода: {str(e)}")
+        logger.exception("Ошибка при отправке кода")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -320,7 +347,7 @@ def verify_email_code_step(request):
 
         # Проверяем код
         if verification_code.verify(code):
-            print(f"Email {email} успешно подтвержден")
+            logger.info("Email %s успешно подтвержден", email)
 
             return Response({
                 'message': 'Email успешно подтвержден! Теперь заполните профиль.',
@@ -346,7 +373,7 @@ def verify_email_code_step(request):
                 )
 
     except Exception as e:
-        print(f"❌ Ошибка при проверке кода: {str(e)}")
+        logger.exception("Ошибка при проверке кода")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -441,7 +468,7 @@ def complete_profile(request):
         token, created = Token.objects.get_or_create(user=user)
 
         # Логирование успешной регистрации
-        print(f"✅ Профиль создан для пользователя: {username} ({email})")
+        logger.info("Профиль создан для пользователя: %s (%s)", username, email)
 
         return Response({
             'message': 'Регистрация завершена! Добро пожаловать в AsuLinkApp!',
@@ -451,7 +478,7 @@ def complete_profile(request):
         }, status=status.HTTP_201_CREATED)
 
     except Exception as e:
-        print(f"❌ Ошибка при создании профиля: {str(e)}")
+        logger.exception("Ошибка при создании профиля")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -481,7 +508,7 @@ def resend_email_code(request):
         # Отправляем новый код верификации
         verification_code = send_verification_code(email)
 
-        print(f"📧 Повторно отправлен код верификации на: {email}")
+        logger.info("Повторно отправлен код верификации на: %s", email)
 
         return Response({
             'message': 'Новый код подтверждения отправлен на ваш email',
@@ -490,7 +517,7 @@ def resend_email_code(request):
         })
 
     except Exception as e:
-        print(f"❌ Ошибка при повторной отправке: {str(e)}")
+        logger.exception("Ошибка при повторной отправке")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -538,7 +565,7 @@ def resend_verification_code(request):
         # Отправляем новый код верификации
         verification_code = send_verification_code(user, email)
 
-        print(f"📧 Повторно отправлен код верификации на: {email}")
+        logger.info("Повторно отправлен код верификации на: %s", email)
 
         return Response({
             'message': 'Новый код подтверждения отправлен на ваш email',
@@ -547,7 +574,7 @@ def resend_verification_code(request):
         })
 
     except Exception as e:
-        print(f"❌ Ошибка при повторной отправке: {str(e)}")
+        logger.exception("Ошибка при повторной отправке")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -611,7 +638,7 @@ def verify_email_code(request):
             # Создаем токен для автоматического входа
             token, created = Token.objects.get_or_create(user=user)
 
-            print(f"Email {email} успешно подтвержден")
+            logger.info("Email %s успешно подтвержден", email)
 
             return Response({
                 'message': 'Email успешно подтвержден!',
@@ -637,7 +664,7 @@ def verify_email_code(request):
                 )
 
     except Exception as e:
-        print(f"❌ Ошибка при проверке кода: {str(e)}")
+        logger.exception("Ошибка при проверке кода")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -692,8 +719,10 @@ def check_email_verification(request):
 def logout_view(request):
     """Выход из системы с удалением токена"""
     try:
-        request.user.auth_token.delete()
-        print(f"✅ Пользователь {request.user.username} вышел из системы")
+        token = request.user.auth_token
+        token.delete()
+        invalidate_token(token.key)
+        logger.info("Пользователь %s вышел из системы", request.user.username)
         return Response({
             'success': True,
             'message': 'Выход выполнен успешно'
@@ -729,12 +758,14 @@ def refresh_token(request):
     """Обновление токена аутентификации"""
     try:
         # Удаляем старый токен
-        request.user.auth_token.delete()
+        old_token = request.user.auth_token
+        old_token.delete()
+        invalidate_token(old_token.key)
 
         # Создаем новый токен
         token = Token.objects.create(user=request.user)
 
-        print(f"✅ Токен обновлен для пользователя {request.user.username}")
+        logger.info("Токен обновлен для пользователя %s", request.user.username)
 
         return Response({
             'success': True,
@@ -749,23 +780,32 @@ def refresh_token(request):
 
 
 class PostListCreateView(generics.ListCreateAPIView):
-    queryset = Post.objects.all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        # В ленте только последние комментарии, полная ветка - /api/posts/<id>/comments/
+        return Post.objects.with_feed_data(
+            self.request.user,
+            comments_preview=settings.FEED_COMMENTS_PREVIEW
+        )
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return PostCreateSerializer
-        return PostSerializer
+        return PostFeedSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
 class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        return Post.objects.with_feed_data(self.request.user)
+
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
             return [permissions.IsAuthenticated()]
@@ -785,10 +825,11 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
 class CommentListCreateView(generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         post_id = self.kwargs['post_id']
-        return Comment.objects.filter(post_id=post_id)
+        return Comment.objects.filter(post_id=post_id).select_related('author__profile')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -801,37 +842,67 @@ class CommentListCreateView(generics.ListCreateAPIView):
         serializer.save(author=self.request.user, post=post)
 
 
+class SearchView(generics.ListAPIView):
+    """Полнотекстовый поиск по постам, событиям, аудиториям и корпусам"""
+    serializer_class = SearchResultSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RankedPagination
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            raise exceptions.ValidationError({'q': 'Укажите поисковый запрос'})
+
+        # Фильтрация по типам: ?type=post,event
+        kinds = [kind for kind in self.request.query_params.get('type', '').split(',') if kind]
+        unknown = set(kinds) - {kind for kind, _ in SearchDocument.KINDS}
+        if unknown:
+            raise exceptions.ValidationError({'type': f'Неизвестные типы: {", ".join(sorted(unknown))}'})
+
+        return SearchResults(query, kinds)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def toggle_like(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    like, created = Like.objects.get_or_create(post=post, user=request.user)
-
-    if not created:
-        like.delete()
-        post.likes = max(0, post.likes - 1)
-        liked = False
-    else:
-        post.likes += 1
-        liked = True
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    posts = Post.objects.filter(pk=post.pk)
+
+    # Счетчик меняется на стороне БД, чтобы параллельные лайки не терялись
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(post=post, user=request.user).delete()
+        if deleted:
+            posts.filter(likes__gt=0).update(likes=F('likes') - 1)
+            liked = False
+        else:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(post=post, user=request.user)
+            except IntegrityError:
+                # Лайк уже поставлен параллельным запросом, счетчик он и увеличил
+                pass
+            else:
+                posts.update(likes=F('likes') + 1)
+            liked = True
 
-    post.save()
+        likes_count = posts.values_list('likes', flat=True).get()
 
     return Response({
         'liked': liked,
-        'likes_count': post.likes
+        'likes_count': likes_count
     })
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def increment_views(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    post.views += 1
-    post.save()
+    post = get_object_or_404(Post.objects.only('id', 'views'), id=post_id)
+
+    # Просмотр попадает в буфер и сохраняется пакетно в фоне
+    pending = view_counter.increment(post.pk)
 
     return Response({
-        'views': post.views
+        'views': post.views + pending
     })
 
 
@@ -936,8 +1007,8 @@ def allauth_register(request):
         # Отправляем email с кодом (вместо ссылки)
         send_verification_code(email, user)
 
-        print(f"Письмо с кодом {verification_code.code} отправлено на: {email}")
-        print(f"Пользователь создан: {username} (неактивен до подтверждения кода)")
+        logger.info("Письмо с кодом %s отправлено на: %s", verification_code.code, email)
+        logger.info("Пользователь создан: %s (неактивен до подтверждения кода)", username)
 
         return Response({
             'message': 'Регистрация успешна! Код подтверждения отправлен на ваш email.',
@@ -950,7 +1021,7 @@ def allauth_register(request):
         }, status=status.HTTP_201_CREATED)
 
     except Exception as e:
-        print(f"Ошибка при регистрации: {str(e)}")
+        logger.exception("Ошибка при регистрации")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1034,7 +1105,7 @@ def resend_confirmation(request):
         # Отправляем новое письмо с подтверждением
         send_email_confirmation(request, user, signup=False)
 
-        print(f"📧 Повторно отправлено письмо с подтверждением на: {email}")
+        logger.info("Повторно отправлено письмо с подтверждением на: %s", email)
 
         return Response({
             'message': 'Новое письмо с подтверждением отправлено на ваш email',
@@ -1042,7 +1113,7 @@ def resend_confirmation(request):
         })
 
     except Exception as e:
-        print(f"❌ Ошибка при повторной отправке: {str(e)}")
+        logger.exception("Ошибка при повторной отправке")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1107,7 +1178,7 @@ def verify_allauth_code(request):
             # Создаем токен для автоматического входа
             token, created = Token.objects.get_or_create(user=user)
 
-            print(f"Код подтвержден для {email}, пользователь активирован")
+            logger.info("Код подтвержден для %s, пользователь активирован", email)
 
             return Response({
                 'message': 'Email успешно подтвержден! Добро пожаловать в AsuLinkApp!',
@@ -1136,7 +1207,7 @@ def verify_allauth_code(request):
                 )
 
     except Exception as e:
-        print(f"❌ Ошибка при проверке кода: {str(e)}")
+        logger.exception("Ошибка при проверке кода")
         return Response(
             {'error': f'Ошибка сервера: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+from .database import database_config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -74,6 +75,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestLoggingMiddleware',
+    'api.middleware.APIProfilingMiddleware',
+    'api.middleware.ReadReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -109,13 +113,49 @@ WSGI_APPLICATION = 'asulinkapp_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DATABASE_URL selects SQLite (tuned with a busy timeout, optionally WAL) or PostgreSQL,
+# see asulinkapp_backend/database.py. The options apply to the replicas as well
+DATABASE_OPTIONS = {
+    # Seconds a connection is reused across requests (0 reconnects on every request)
+    'conn_max_age': config('DATABASE_CONN_MAX_AGE', default=60, cast=int),
+    # Check a reused connection before the request instead of failing on a dropped one
+    'conn_health_checks': config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    'busy_timeout_ms': config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+    # WAL for deployments; empty keeps the file's own mode, so commands run against
+    # the development db.sqlite3 from the repository do not rewrite it
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default=''),
+    # PostgreSQL connection pool (psycopg[pool]); replaces persistent connections
+    'pool': config('DATABASE_POOL', default=False, cast=bool),
+    'pool_min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+    'pool_max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+    'pool_timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=int),
+}
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(config('DATABASE_URL', default='sqlite:///db.sqlite3'), BASE_DIR, **DATABASE_OPTIONS)
 }
 
+# Read replicas: comma-separated URLs in the DATABASE_URL format, registered as
+# replica1, replica2, ... Safe requests to views of DATABASE_REPLICA_APPS read
+# from them, see api/replicas.py
+DATABASE_REPLICAS = []
+for replica_number, replica_url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    replica_alias = f'replica{replica_number}'
+    DATABASES[replica_alias] = database_config(replica_url, BASE_DIR, **DATABASE_OPTIONS)
+    # Tests use the primary test database through the replica aliases
+    DATABASES[replica_alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(replica_alias)
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+DATABASE_REPLICA_APPS = ['api', 'events', 'campus']
+
+# Seconds a client keeps reading from the primary after a write (read-your-writes);
+# should exceed the replication lag
+DATABASE_REPLICA_PIN_SECONDS = config('DATABASE_REPLICA_PIN_SECONDS', default=10, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -164,7 +204,7 @@ SITE_ID = 1
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -177,6 +217,68 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Logging: JSON lines written to stdout from a background thread
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'api.access_log.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'json_console': {
+            '()': 'api.access_log.QueueHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        app: {
+            'handlers': ['json_console'],
+            'level': config('LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        }
+        for app in ['accounts', 'api', 'campus', 'events', 'posts']
+    },
+}
+
+# Share of successful API requests written to the access log (server errors are always logged)
+ACCESS_LOG_SAMPLE_RATE = config('ACCESS_LOG_SAMPLE_RATE', default=1.0, cast=float)
+
+# Per-request profiling (Server-Timing headers and /api/profiling/ route histograms)
+API_PROFILING_ENABLED = config('API_PROFILING_ENABLED', default=False, cast=bool)
+
+# Cache (use a shared backend such as Redis when running several workers)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='asulinkapp'),
+    }
+}
+
+# How long a resolved auth token is cached, in seconds
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=300, cast=int)
+
+# How long campus statistics stay cached, in seconds (they are also invalidated on review changes)
+CAMPUS_STATISTICS_CACHE_TIMEOUT = config('CAMPUS_STATISTICS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# How long campus list/detail responses stay cached, in seconds; any campus change
+# makes them unreachable earlier, the timeout only bounds the memory they occupy
+CAMPUS_RESPONSE_CACHE_TIMEOUT = config('CAMPUS_RESPONSE_CACHE_TIMEOUT', default=86400, cast=int)
+
+# How long a built month of the events calendar stays cached, in seconds (also invalidated on event changes)
+EVENTS_CALENDAR_CACHE_TIMEOUT = config('EVENTS_CALENDAR_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Number of latest comments embedded in each post of the feed
+FEED_COMMENTS_PREVIEW = config('FEED_COMMENTS_PREVIEW', default=3, cast=int)
+
+# Number of participants and reviews embedded in the event detail response
+EVENT_DETAIL_PREVIEW_SIZE = config('EVENT_DETAIL_PREVIEW_SIZE', default=10, cast=int)
+
+# How often buffered post views are flushed to the database, in seconds (0 writes every view immediately)
+POST_VIEWS_FLUSH_INTERVAL = config('POST_VIEWS_FLUSH_INTERVAL', default=5.0, cast=float)
+
 # CORS Configuration for physical devices and emulators
 CORS_ALLOWED_ORIGINS = [
     # Localhost for development
@@ -0,0 +1,204 @@
+"""
+Автодополнение номеров аудиторий и названий корпусов.
+
+Индекс строится в памяти процесса при первом запросе и отвечает без
+обращений к БД: префиксы ищутся двоичным поиском по отсортированным ключам,
+подстроки от трех символов - по триграммам, более короткие (только для
+списка аудиторий, см. min_substring) - перебором ключей. Изменение аудитории или корпуса
+меняет версию индекса в кэше (campus.cache), и каждый процесс при следующем
+запросе перестраивает свою копию.
+"""
+
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from api.replicas import replica_reads
+from .cache import autocomplete_version
+from .models import Building, Room
+
+ROOM = 'room'
+BUILDING = 'building'
+
+# Порядок типов при равной релевантности
+KIND_ORDER = {BUILDING: 0, ROOM: 1}
+
+# Разделители внутри номеров: "3-14", "3.14" и "314" - один и тот же ключ
+SEPARATORS = re.compile(r'[\s\-./]+')
+
+# Релевантность совпадения токена запроса с ключом: меньше - лучше
+EXACT, PREFIX, SECONDARY, SUBSTRING = range(4)
+
+# Минимальная длина подстроки для триграмм
+TRIGRAM = 3
+
+
+def compact(text):
+    return SEPARATORS.sub('', text.lower().replace('ё', 'е'))
+
+
+def name_keys(name):
+    """Ключи названия: каждое слово и все название целиком"""
+    words = [compact(word) for word in name.split()]
+    return {key for key in [*words, compact(name)] if key}
+
+
+def trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class Entry:
+    """Аудитория или корпус в индексе"""
+
+    __slots__ = ('kind', 'id', 'label', 'data', 'primary', 'secondary')
+
+    def __init__(self, kind, id, label, data, primary, secondary=()):
+        self.kind = kind
+        self.id = id
+        self.label = label
+        self.data = data
+        # По основным ключам объект находится, по дополнительным - уточняется:
+        # "214 л" находит аудиторию 214 корпуса Л, а "л" не выдает все его аудитории
+        self.primary = frozenset(primary)
+        self.secondary = frozenset(secondary)
+
+    def match(self, token, min_substring=TRIGRAM):
+        """Релевантность токена для объекта или None"""
+        if token in self.primary:
+            return EXACT
+        if any(key.startswith(token) for key in self.primary):
+            return PREFIX
+        if any(key.startswith(token) for key in self.secondary):
+            return SECONDARY
+        if len(token) >= min_substring and any(token in key for key in self.primary):
+            return SUBSTRING
+        return None
+
+
+class AutocompleteIndex:
+    """Неизменяемый снимок индекса; обновление заменяет снимок целиком"""
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.entries = entries
+
+        pairs = sorted((key, position) for position, entry in enumerate(entries) for key in entry.primary)
+        self.keys = [key for key, _ in pairs]
+        self.positions = [position for _, position in pairs]
+
+        postings = defaultdict(set)
+        for position, entry in enumerate(entries):
+            for key in entry.primary:
+                for trigram in trigrams(key):
+                    postings[trigram].add(position)
+        self.trigrams = {trigram: frozenset(positions) for trigram, positions in postings.items()}
+
+    @classmethod
+    def load(cls, version=None):
+        """Читает корпуса и аудитории из БД (два запроса)"""
+        buildings = {
+            building.id: building
+            for building in Building.objects.only('id', 'name', 'address')
+        }
+
+        entries = []
+        for building in buildings.values():
+            entries.append(Entry(
+                BUILDING, building.id, building.name,
+                {'name': building.name, 'address': building.address},
+                name_keys(building.name)
+            ))
+
+        for room in Room.objects.only('id', 'number', 'floor', 'room_type', 'building_id').iterator():
+            building = buildings.get(room.building_id)
+            building_name = building.name if building else ''
+            entries.append(Entry(
+                ROOM, room.id, f'{room.number}, {building_name}' if building_name else room.number,
+                {
+                    'number': room.number,
+                    'floor': room.floor,
+                    'room_type': room.room_type,
+                    'building_id': room.building_id,
+                    'building_name': building_name,
+                },
+                {compact(room.number)} - {''},
+                name_keys(building_name)
+            ))
+        return cls(entries, version)
+
+    def candidates(self, token, min_substring=TRIGRAM):
+        """
+        Объекты, у которых основной ключ начинается с токена или содержит его:
+        позиция -> релевантность (совпадения по префиксу известны без проверки)
+        """
+        found = {}
+        index = bisect_left(self.keys, token)
+        while index < len(self.keys) and self.keys[index].startswith(token):
+            score = EXACT if self.keys[index] == token else PREFIX
+            position = self.positions[index]
+            found[position] = min(score, found.get(position, score))
+            index += 1
+
+        if len(token) >= TRIGRAM:
+            postings = [self.trigrams.get(trigram, frozenset()) for trigram in trigrams(token)]
+            # Триграммы дают кандидатов, само вхождение проверяет Entry.match
+            for position in frozenset.intersection(*sorted(postings, key=len)):
+                found.setdefault(position, None)
+        elif len(token) >= min_substring:
+            # Для одного-двух символов триграмм нет: перебор ключей в памяти
+            for key, position in zip(self.keys, self.positions):
+                if token in key:
+                    found.setdefault(position, SUBSTRING)
+        return found
+
+    def search(self, query, kinds=None, limit=10, min_substring=TRIGRAM):
+        tokens = [token for token in (compact(word) for word in query.split()) if token]
+        if not tokens:
+            return []
+
+        # Хотя бы один токен должен совпасть с основным ключом
+        candidates = {}
+        for token in tokens:
+            for position, score in self.candidates(token, min_substring).items():
+                candidates.setdefault(position, {})[token] = score
+
+        scored = []
+        for position, known in candidates.items():
+            entry = self.entries[position]
+            if kinds and entry.kind not in kinds:
+                continue
+            scores = [
+                known[token] if known.get(token) is not None else entry.match(token, min_substring)
+                for token in tokens
+            ]
+            if None in scores:
+                continue
+            scored.append((sum(scores), KIND_ORDER[entry.kind], entry.label, position))
+
+        scored = sorted(scored) if limit is None else heapq.nsmallest(limit, scored)
+        return [self.entries[position] for *_, position in scored]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Актуальный снимок индекса; перестраивается, если версия в кэше сменилась"""
+    global _index
+    version = autocomplete_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                # Индекс живет до следующего изменения, поэтому строится по основной БД:
+                # снимок отстающей реплики остался бы в памяти под новой версией
+                with replica_reads(False):
+                    _index = AutocompleteIndex.load(version)
+            index = _index
+    return index
+
+
+def search(query, kinds=None, limit=10, min_substring=TRIGRAM):
+    return get_index().search(query, kinds, limit, min_substring)
@@ -0,0 +1,72 @@
+"""
+Кэширование данных кампуса
+"""
+
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+AUTOCOMPLETE_VERSION_KEY = 'campus:autocomplete:version'
+DATA_VERSION_KEY = 'campus:data:version'
+
+
+def room_statistics_cache_key(version, room_id):
+    """
+    Статистика хранится под версией данных кампуса (см. data_version): отзыв меняет
+    версию сразу и после коммита, поэтому статистика, посчитанная до изменения
+    и записанная после него, ложится под старую версию и не читается
+    """
+    return f'campus:room_statistics:{version}:{room_id}'
+
+
+def get_room_statistics(version, room_id):
+    return cache.get(room_statistics_cache_key(version, room_id))
+
+
+def set_room_statistics(version, room_id, data):
+    cache.set(room_statistics_cache_key(version, room_id), data, settings.CAMPUS_STATISTICS_CACHE_TIMEOUT)
+
+
+def autocomplete_version():
+    """Версия индекса автодополнения; процессы сверяют с ней свою копию индекса"""
+    version = cache.get(AUTOCOMPLETE_VERSION_KEY)
+    if version is None:
+        cache.add(AUTOCOMPLETE_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(AUTOCOMPLETE_VERSION_KEY)
+    return version
+
+
+def invalidate_autocomplete():
+    cache.set(AUTOCOMPLETE_VERSION_KEY, time.time_ns(), None)
+
+
+def data_version():
+    """
+    Версия данных кампуса (корпуса, аудитории, отзывы). Ответы кэшируются
+    под текущей версией, изменение данных ее меняет - старые ответы больше не читаются
+    """
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def invalidate_data():
+    cache.set(DATA_VERSION_KEY, time.time_ns(), None)
+
+
+def response_cache_key(version, request):
+    """Ключ ответа: версия данных, адрес (ссылки в ответе абсолютные) и параметры в порядке имен"""
+    query = sorted(request.GET.lists())
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{query}'
+    return f'campus:response:{version}:{hashlib.md5(url.encode()).hexdigest()}'
+
+
+def get_response_data(version, request):
+    return cache.get(response_cache_key(version, request))
+
+
+def set_response_data(version, request, data):
+    cache.set(response_cache_key(version, request), data, settings.CAMPUS_RESPONSE_CACHE_TIMEOUT)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from campus.cache import invalidate_data
+from campus.models import Building, Room
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stored rating aggregates of rooms and buildings from reviews'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding rating aggregates...')
+
+        # Корпуса считаются из аудиторий, поэтому аудитории пересчитываем первыми
+        with transaction.atomic():
+            rooms = Room.objects.rebuild_rating_aggregates()
+            buildings = Building.objects.rebuild_rating_aggregates()
+        # update() не вызывает сигналы: кэшированные ответы сбрасываем сами
+        invalidate_data()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt aggregates for {rooms} room(s) and {buildings} building(s)'
+        ))
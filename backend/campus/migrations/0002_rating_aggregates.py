@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:00
+
+from django.db import migrations, models
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def aggregate_subquery(queryset, field, function):
+    return Coalesce(
+        Subquery(queryset.order_by().values(field).annotate(total=function).values('total')),
+        0
+    )
+
+
+def aggregate_fields(rating_sum, reviews_count):
+    return {
+        'rating_sum': rating_sum,
+        'reviews_count': reviews_count,
+        'average_rating': Coalesce(Cast(rating_sum, FloatField()) / NullIf(reviews_count, 0), 0.0),
+    }
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    Building = apps.get_model('campus', 'Building')
+    Room = apps.get_model('campus', 'Room')
+    RoomReview = apps.get_model('campus', 'RoomReview')
+
+    reviews = RoomReview.objects.filter(room=OuterRef('pk'))
+    Room.objects.update(**aggregate_fields(
+        aggregate_subquery(reviews, 'room', Sum('rating')),
+        aggregate_subquery(reviews, 'room', Count('id')),
+    ))
+
+    rooms = Room.objects.filter(building=OuterRef('pk'))
+    Building.objects.update(**aggregate_fields(
+        aggregate_subquery(rooms, 'building', Sum('rating_sum')),
+        aggregate_subquery(rooms, 'building', Sum('reviews_count')),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campus', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Sum of ratings'),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Number of reviews'),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='average_rating',
+            field=models.FloatField(default=0, editable=False, verbose_name='Average rating'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Sum of ratings'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Number of reviews'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='average_rating',
+            field=models.FloatField(default=0, editable=False, verbose_name='Average rating'),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campus', '0002_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['building', 'floor', 'room_type'], name='room_building_floor_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['room_type', 'floor'], name='room_type_floor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomreview',
+            index=models.Index(fields=['room', '-created_at'], name='room_review_room_created_idx'),
+        ),
+    ]
@@ -1,8 +1,49 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum, Count
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
+from .cache import invalidate_autocomplete, invalidate_data
 import uuid
 
 
+def rating_aggregates(rating_sum, reviews_count):
+    """Field values for the stored rating aggregates, computed on the database side"""
+    return {
+        'rating_sum': rating_sum,
+        'reviews_count': reviews_count,
+        'average_rating': Coalesce(Cast(rating_sum, FloatField()) / NullIf(reviews_count, 0), 0.0),
+    }
+
+
+def _aggregate_subquery(queryset, field, function):
+    return Coalesce(
+        Subquery(queryset.order_by().values(field).annotate(total=function).values('total')),
+        0
+    )
+
+
+class BuildingQuerySet(models.QuerySet):
+    def rebuild_rating_aggregates(self):
+        """Recomputes stored building aggregates from the room aggregates in bulk"""
+        rooms = Room.objects.filter(building=OuterRef('pk'))
+        return self.update(**rating_aggregates(
+            _aggregate_subquery(rooms, 'building', Sum('rating_sum')),
+            _aggregate_subquery(rooms, 'building', Sum('reviews_count')),
+        ))
+
+
+class RoomQuerySet(models.QuerySet):
+    def rebuild_rating_aggregates(self):
+        """Recomputes stored room aggregates from RoomReview rows in bulk"""
+        reviews = RoomReview.objects.filter(room=OuterRef('pk'))
+        return self.update(**rating_aggregates(
+            _aggregate_subquery(reviews, 'room', Sum('rating')),
+            _aggregate_subquery(reviews, 'room', Count('id')),
+        ))
+
+
 class Building(models.Model):
     """Model for university buildings"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -16,10 +57,17 @@ class Building(models.Model):
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, verbose_name="Latitude")
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, verbose_name="Longitude")
 
+    # Rating aggregates over all reviews of the building's rooms
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, verbose_name="Sum of ratings")
+    reviews_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Number of reviews")
+    average_rating = models.FloatField(default=0, editable=False, verbose_name="Average rating")
+
     # System fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BuildingQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
         verbose_name = "Building"
@@ -28,18 +76,10 @@ class Building(models.Model):
     def __str__(self):
         return self.name
 
-    @property
-    def average_rating(self):
-        """Average rating of all rooms in the building"""
-        rooms = self.rooms.all()
-        if rooms:
-            total_rating = sum(room.average_rating for room in rooms if room.average_rating > 0)
-            rated_rooms = sum(1 for room in rooms if room.average_rating > 0)
-            return total_rating / rated_rooms if rated_rooms > 0 else 0
-        return 0
-
     @property
     def total_rooms(self):
+        if hasattr(self, 'rooms_total'):
+            return self.rooms_total
         return self.rooms.count()
 
 
@@ -70,29 +110,37 @@ class Room(models.Model):
     # Accessibility
     is_accessible = models.BooleanField(default=True, verbose_name="Available for use")
 
+    # Rating aggregates, maintained by RoomReview signals
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, verbose_name="Sum of ratings")
+    reviews_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Number of reviews")
+    average_rating = models.FloatField(default=0, editable=False, verbose_name="Average rating")
+
     # System fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RoomQuerySet.as_manager()
+
     class Meta:
         ordering = ['building', 'floor', 'number']
         unique_together = ('building', 'number')
+        indexes = [
+            # Room list filters: building (+ floor, + type) and type (+ floor) across buildings
+            models.Index(fields=['building', 'floor', 'room_type'], name='room_building_floor_type_idx'),
+            models.Index(fields=['room_type', 'floor'], name='room_type_floor_idx'),
+        ]
         verbose_name = "Room"
         verbose_name_plural = "Rooms"
 
     def __str__(self):
         return f"{self.building.name} - {self.number}"
 
-    @property
-    def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
-
-    @property
-    def reviews_count(self):
-        return self.reviews.count()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored building to move the rating totals when it changes
+        instance._loaded_building_id = instance.__dict__.get('building_id')
+        return instance
 
 
 class RoomReview(models.Model):
@@ -135,8 +183,116 @@ class RoomReview(models.Model):
     class Meta:
         unique_together = ('room', 'author')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['room', '-created_at'], name='room_review_room_created_idx'),
+        ]
         verbose_name = "Room Review"
         verbose_name_plural = "Room Reviews"
 
     def __str__(self):
         return f"Review by {self.author.username} for {self.room} - {self.rating}/5"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values to apply only the difference to the aggregates
+        instance._loaded_rating = instance.__dict__.get('rating')
+        instance._loaded_room_id = instance.__dict__.get('room_id')
+        return instance
+
+
+def apply_rating_change(room_id, rating_delta, count_delta):
+    """Atomically shifts the stored aggregates of a room and its building"""
+    if not rating_delta and not count_delta:
+        return
+
+    changes = rating_aggregates(F('rating_sum') + rating_delta, F('reviews_count') + count_delta)
+    with transaction.atomic():
+        Room.objects.filter(pk=room_id).update(**changes)
+        Building.objects.filter(rooms=room_id).update(**changes)
+
+
+def rebuild_room_aggregates(*room_ids):
+    """Recomputes the aggregates of the rooms and their buildings from the reviews"""
+    with transaction.atomic():
+        Room.objects.filter(pk__in=room_ids).rebuild_rating_aggregates()
+        Building.objects.filter(pk__in=Room.objects.filter(pk__in=room_ids).values('building')).rebuild_rating_aggregates()
+
+
+@receiver(post_save, sender=RoomReview)
+def add_review_to_aggregates(sender, instance, created, raw=False, **kwargs):
+    """Updates room and building aggregates when a review is created or changed"""
+    if raw:
+        return
+
+    loaded_room_id = getattr(instance, '_loaded_room_id', None)
+    loaded_rating = getattr(instance, '_loaded_rating', None)
+
+    if created:
+        apply_rating_change(instance.room_id, instance.rating, 1)
+    elif loaded_room_id is None or loaded_rating is None:
+        # The previous values are unknown (e.g. a deferred field), recompute from the reviews
+        rebuild_room_aggregates(*{instance.room_id, loaded_room_id} - {None})
+    elif loaded_room_id != instance.room_id:
+        apply_rating_change(loaded_room_id, -loaded_rating, -1)
+        apply_rating_change(instance.room_id, instance.rating, 1)
+    else:
+        apply_rating_change(instance.room_id, instance.rating - loaded_rating, 0)
+
+    instance._loaded_rating = instance.rating
+    instance._loaded_room_id = instance.room_id
+
+
+@receiver(post_delete, sender=RoomReview)
+def remove_review_from_aggregates(sender, instance, **kwargs):
+    """Updates room and building aggregates when a review is deleted"""
+    room_id = getattr(instance, '_loaded_room_id', None) or instance.room_id
+    rating = getattr(instance, '_loaded_rating', None) or instance.__dict__.get('rating')
+    if rating is None:
+        # A deferred rating cannot be loaded from the deleted row
+        rebuild_room_aggregates(room_id)
+    else:
+        apply_rating_change(room_id, -rating, -1)
+
+
+@receiver(post_save, sender=Room)
+def move_room_aggregates(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Moves the room's rating totals to its new building"""
+    if raw or (update_fields is not None and 'building' not in update_fields):
+        return
+
+    loaded_building_id = getattr(instance, '_loaded_building_id', None)
+    if not created and loaded_building_id != instance.building_id:
+        # Recomputed from the stored room aggregates rather than shifted by the
+        # in-memory totals, which may be older than the row.
+        # An unknown previous building means all buildings are recomputed
+        buildings = Building.objects.all()
+        if loaded_building_id is not None:
+            buildings = buildings.filter(pk__in=[loaded_building_id, instance.building_id])
+        buildings.rebuild_rating_aggregates()
+    instance._loaded_building_id = instance.building_id
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def refresh_autocomplete(sender, **kwargs):
+    """Room numbers and building names changed: rebuild the in-memory autocomplete index"""
+    # After commit, so that another process cannot rebuild from data that is not visible yet
+    transaction.on_commit(invalidate_autocomplete)
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=RoomReview)
+@receiver(post_delete, sender=RoomReview)
+def refresh_cached_responses(sender, **kwargs):
+    """Campus data changed: cached campus responses must not be served anymore"""
+    # Right away, so that this connection never reads its own change from the cache,
+    # and again after commit: a response built by another request before the commit
+    # (from the old data) is cached under the intermediate version and gets dropped
+    invalidate_data()
+    transaction.on_commit(invalidate_data)
@@ -1,3 +1,399 @@
-from django.test import TestCase
+import uuid
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from api.testing import QueryPlanAssertionsMixin
+from .cache import data_version
+from .models import Building, Room, RoomReview
 
-# Create your tests here.
+
+class CampusTestCase(APITestCase):
+    """Общие данные для тестов кампуса"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student')
+        self.client.force_authenticate(self.user)
+        self.building = Building.objects.create(name='Корпус Л', address='пр. Ленина, 61', floors=4)
+        self.room = Room.objects.create(building=self.building, number='214', floor=2, room_type='lecture', capacity=150)
+        self.other_room = Room.objects.create(building=self.building, number='105', floor=1, room_type='computer', capacity=25)
+
+    def review(self, room, rating, **fields):
+        author = User.objects.create_user(username=f'reviewer{RoomReview.objects.count()}')
+        return RoomReview.objects.create(room=room, author=author, rating=rating, **fields)
+
+    def assertAggregates(self, obj, rating_sum, reviews_count, average_rating):
+        obj.refresh_from_db()
+        self.assertEqual(obj.rating_sum, rating_sum)
+        self.assertEqual(obj.reviews_count, reviews_count)
+        self.assertAlmostEqual(obj.average_rating, average_rating)
+
+
+class RatingAggregatesTests(CampusTestCase):
+    """Хранимые агрегаты оценок аудиторий и корпусов"""
+
+    def test_aggregates_follow_review_changes(self):
+        first = self.review(self.room, 5)
+        self.review(self.room, 2)
+        self.review(self.other_room, 4)
+
+        self.assertAggregates(self.room, 7, 2, 3.5)
+        self.assertAggregates(self.building, 11, 3, 11 / 3)
+
+        first.rating = 3
+        first.save()
+        self.assertAggregates(self.room, 5, 2, 2.5)
+        self.assertAggregates(self.building, 9, 3, 3.0)
+
+        first.delete()
+        self.assertAggregates(self.room, 2, 1, 2.0)
+        self.assertAggregates(self.building, 6, 2, 3.0)
+
+    def test_update_through_api_applies_difference(self):
+        review = RoomReview.objects.create(room=self.room, author=self.user, rating=1)
+
+        self.client.patch(reverse('api:campus:review-detail', args=[review.id]), {'rating': 4})
+        self.assertAggregates(self.room, 4, 1, 4.0)
+
+        self.client.delete(reverse('api:campus:review-detail', args=[review.id]))
+        self.assertAggregates(self.room, 0, 0, 0.0)
+        self.assertAggregates(self.building, 0, 0, 0.0)
+
+    def test_deleting_room_removes_its_reviews_from_building(self):
+        self.review(self.room, 5)
+        self.review(self.other_room, 1)
+
+        self.room.delete()
+
+        self.assertAggregates(self.building, 1, 1, 1.0)
+
+    def test_moving_room_moves_its_totals(self):
+        other_building = Building.objects.create(name='Корпус М', address='ул. Димитрова, 66')
+        self.review(self.room, 5)
+        self.review(self.other_room, 1)
+
+        room = Room.objects.get(pk=self.room.pk)
+        room.building = other_building
+        room.save()
+
+        self.assertAggregates(self.building, 1, 1, 1.0)
+        self.assertAggregates(other_building, 5, 1, 5.0)
+
+    def test_deferred_rating_falls_back_to_rebuild(self):
+        review = self.review(self.room, 5)
+        review = RoomReview.objects.defer('rating').get(pk=review.pk)
+        review.comment = 'Уточнение'
+        review.save(update_fields=['comment'])
+        self.assertAggregates(self.room, 5, 1, 5.0)
+
+        RoomReview.objects.defer('rating').get(pk=review.pk).delete()
+        self.assertAggregates(self.room, 0, 0, 0.0)
+        self.assertAggregates(self.building, 0, 0, 0.0)
+
+    def test_rebuild_command(self):
+        self.review(self.room, 5)
+        self.review(self.other_room, 3)
+        Room.objects.update(rating_sum=0, reviews_count=0, average_rating=0)
+        Building.objects.update(rating_sum=100, reviews_count=1, average_rating=100)
+
+        out = StringIO()
+        call_command('rebuild_rating_aggregates', stdout=out)
+
+        self.assertAggregates(self.room, 5, 1, 5.0)
+        self.assertAggregates(self.other_room, 3, 1, 3.0)
+        self.assertAggregates(self.building, 8, 2, 4.0)
+        self.assertIn('2 room(s) and 1 building(s)', out.getvalue())
+
+    def test_building_list_reads_stored_aggregates(self):
+        for i in range(3):
+            building = Building.objects.create(name=f'Корпус {i}', address='Адрес')
+            room = Room.objects.create(building=building, number='101', floor=1)
+            self.review(room, 4)
+
+        # Подсчет для пагинации и сама страница
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api:campus:building-list'))
+
+        item = next(item for item in response.data['results'] if item['name'] == 'Корпус 0')
+        self.assertEqual(item['average_rating'], 4.0)
+        self.assertEqual(item['total_rooms'], 1)
+
+
+class RoomStatisticsTests(CampusTestCase):
+    """Статистика аудитории одним запросом с кэшированием"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = reverse('api:campus:room-statistics', args=[self.room.id])
+
+    def test_statistics_in_single_query(self):
+        self.review(self.room, 5, cleanliness_rating=4, comfort_rating=5)
+        self.review(self.room, 4, cleanliness_rating=2)
+        self.review(self.room, 4)
+        self.review(self.other_room, 1, equipment_rating=1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data, {
+            'room_id': str(self.room.id),
+            'total_reviews': 3,
+            'average_rating': 13 / 3,
+            'rating_distribution': {1: 0, 2: 0, 3: 0, 4: 2, 5: 1},
+            'category_ratings': {'cleanliness': 3.0, 'comfort': 5.0}
+        })
+
+    def test_room_without_reviews(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['total_reviews'], 0)
+        self.assertEqual(response.data['rating_distribution'], {})
+
+    def test_unknown_room(self):
+        response = self.client.get(reverse('api:campus:room-statistics', args=[uuid.uuid4()]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_until_review_changes(self):
+        review = self.review(self.room, 5)
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data['average_rating'], 5.0)
+
+        review.rating = 1
+        review.save()
+        self.assertEqual(self.client.get(self.url).data['average_rating'], 1.0)
+
+        review.delete()
+        self.assertEqual(self.client.get(self.url).data['total_reviews'], 0)
+
+    def test_statistics_counted_before_commit_are_not_served(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.review(self.room, 5)
+        # Другой запрос успел посчитать и сохранить статистику до коммита
+        self.client.get(self.url)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(self.url).data['total_reviews'], 1)
+
+
+class BuildingStatisticsTests(CampusTestCase):
+    """Статистика корпуса по типам аудиторий"""
+
+    def test_exact_per_type_statistics_in_constant_queries(self):
+        lecture = Room.objects.create(building=self.building, number='301', floor=3, room_type='lecture', capacity=50)
+        self.review(self.room, 5)
+        self.review(self.room, 5)
+        self.review(self.room, 5)
+        self.review(lecture, 1)
+        self.review(self.other_room, 3)
+        for i in range(20):
+            Room.objects.create(building=self.building, number=f'4{i:02}', floor=4, room_type='classroom', capacity=30)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api:campus:building-statistics', args=[self.building.id]))
+
+        self.assertEqual(response.data['total_rooms'], 23)
+        self.assertEqual(response.data['total_reviews'], 5)
+        self.assertAlmostEqual(response.data['average_rating'], 19 / 5)
+
+        room_types = response.data['room_types']
+        self.assertEqual(room_types['Lecture Hall'], {
+            'count': 2,
+            'average_rating': 4.0,
+            'total_capacity': 200,
+            'total_reviews': 4,
+        })
+        self.assertEqual(room_types['Computer Lab']['average_rating'], 3.0)
+        self.assertEqual(room_types['Classroom'], {
+            'count': 20,
+            'average_rating': 0,
+            'total_capacity': 600,
+            'total_reviews': 0,
+        })
+
+
+class CampusQueryPlanTests(QueryPlanAssertionsMixin, CampusTestCase):
+    """Запросы эндпоинтов кампуса используют индексы"""
+
+    def test_filtered_room_list(self):
+        url = reverse('api:campus:room-list')
+        filters = (
+            {'building': self.building.id, 'floor': 2, 'type': 'lecture'},
+            {'building': self.building.id},
+            {'type': 'computer'},
+            {'type': 'computer', 'floor': 1},
+        )
+        for params in filters:
+            with self.subTest(params=params), self.assertNoFullTableScans():
+                self.assertEqual(self.client.get(url, params).status_code, 200)
+
+    def test_unfiltered_room_list(self):
+        # Без фильтров пагинатор считает все аудитории: COUNT(*) обходит самый
+        # компактный индекс таблицы целиком, это и есть подсчет. Страница
+        # сортируется по названию корпуса через JOIN и читает все аудитории;
+        # таблица небольшая, а ответ кэшируется (CachedResponseMixin)
+        with self.assertNoFullTableScans(allow=['room_type_floor_idx', 'room_building_floor_type_idx']):
+            self.assertEqual(self.client.get(reverse('api:campus:room-list')).status_code, 200)
+
+    def test_statistics_and_reviews(self):
+        self.review(self.room, 4)
+        urls = [
+            reverse('api:campus:building-statistics', args=[self.building.id]),
+            reverse('api:campus:room-statistics', args=[self.room.id]),
+            reverse('api:campus:room-reviews', args=[self.room.id]),
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertNoFullTableScans():
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class AutocompleteTests(CampusTestCase):
+    """Автодополнение аудиторий и корпусов из индекса в памяти"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = reverse('api:campus:autocomplete')
+        self.other_building = Building.objects.create(name='Корпус М', address='ул. Димитрова, 66')
+        self.dashed = Room.objects.create(building=self.other_building, number='3-14', floor=3)
+        Room.objects.create(building=self.other_building, number='214', floor=2)
+
+    def suggest(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['type'], item['label']) for item in response.data['results']]
+
+    def test_prefixes_and_separators(self):
+        self.assertEqual(self.suggest('21'), [('room', '214, Корпус Л'), ('room', '214, Корпус М')])
+        self.assertEqual(self.suggest('3-1'), [('room', '3-14, Корпус М')])
+        self.assertEqual(self.suggest('314'), [('room', '3-14, Корпус М')])
+        self.assertEqual(self.suggest('корп', type='building'), [('building', 'Корпус Л'), ('building', 'Корпус М')])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_building_name_narrows_rooms(self):
+        self.assertEqual(self.suggest('214 м'), [('room', '214, Корпус М')])
+        # Одно название корпуса не выдает все его аудитории
+        self.assertEqual(self.suggest('м'), [('building', 'Корпус М')])
+
+    def test_substring_from_three_characters(self):
+        Room.objects.create(building=self.building, number='Л-305', floor=3)
+        self.assertEqual(self.suggest('305'), [('room', 'Л-305, Корпус Л')])
+        self.assertEqual(self.suggest('05'), [])
+
+    def test_warm_index_does_not_query_database(self):
+        self.suggest('21')
+        with self.assertNumQueries(0):
+            self.suggest('105')
+
+    def test_index_follows_changes(self):
+        self.suggest('21')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.number = '218'
+            self.room.save()
+        self.assertEqual(self.suggest('21'), [('room', '214, Корпус М'), ('room', '218, Корпус Л')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_building.delete()
+        self.assertEqual(self.suggest('21'), [('room', '218, Корпус Л')])
+
+    def test_room_list_search_uses_index(self):
+        response = self.client.get(reverse('api:campus:room-list'), {'search': '214 л'})
+        self.assertEqual([room['id'] for room in response.data['results']], [str(self.room.id)])
+
+    def test_room_list_search_matches_short_substrings(self):
+        dashed = Room.objects.create(building=self.building, number='Л-305', floor=3)
+        url = reverse('api:campus:room-list')
+
+        def found(**params):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            return [room['number'] for room in response.data['results']]
+
+        self.assertEqual(found(search='05'), ['105', 'Л-305'])
+        self.assertEqual(found(search='21'), ['214', '214'])
+        self.assertEqual(found(search='4', floor='3'), ['3-14'])
+        self.assertEqual(found(search='05', building=str(self.building.id), floor='3'), [dashed.number])
+        self.assertEqual(self.client.get(url, {'search': '1'}).data['count'], 4)
+
+    def test_room_list_search_filters_like_database(self):
+        url = reverse('api:campus:room-list')
+        for params in ({'floor': '02'}, {'building': str(self.building.id).upper()}):
+            with self.subTest(params=params):
+                listed = self.client.get(url, params).data['results']
+                found = self.client.get(url, {**params, 'search': '214'}).data['results']
+                self.assertIn(str(self.room.id), [room['id'] for room in found])
+                self.assertEqual(found, [room for room in listed if '214' in room['number']])
+
+        for params in ({'floor': 'второй'}, {'building': 'корпус'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+                self.assertEqual(self.client.get(url, {**params, 'search': '214'}).status_code, 400)
+
+
+class ResponseCacheTests(CampusTestCase):
+    """Кэш ответов кампуса по версии данных"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.list_url = reverse('api:campus:building-list')
+        self.detail_url = reverse('api:campus:building-detail', args=[self.building.id])
+        self.rooms_url = reverse('api:campus:room-list')
+
+    def test_repeated_requests_are_served_from_cache(self):
+        for url in (self.list_url, self.detail_url, self.rooms_url):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.data, first.data)
+
+    def test_query_parameters_are_part_of_the_key(self):
+        first_floor = self.client.get(self.rooms_url, {'floor': 1, 'type': 'computer'})
+        self.assertEqual([room['number'] for room in first_floor.data['results']], ['105'])
+        self.assertEqual(self.client.get(self.rooms_url, {'floor': 2}).data['results'][0]['number'], '214')
+
+        # Порядок параметров не важен
+        with self.assertNumQueries(0):
+            reordered = self.client.get(f'{self.rooms_url}?type=computer&floor=1')
+        self.assertEqual(reordered.data, first_floor.data)
+
+    def test_changes_invalidate_responses(self):
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        self.client.get(self.rooms_url)
+
+        self.building.name = 'Корпус Л (главный)'
+        self.building.save()
+        self.assertEqual(self.client.get(self.list_url).data['results'][0]['name'], 'Корпус Л (главный)')
+
+        self.room.capacity = 200
+        self.room.save()
+        rooms = {room['number']: room for room in self.client.get(self.detail_url).data['rooms']}
+        self.assertEqual(rooms['214']['capacity'], 200)
+
+        self.review(self.room, 4)
+        rooms = {room['number']: room for room in self.client.get(self.rooms_url).data['results']}
+        self.assertEqual(rooms['214']['reviews_count'], 1)
+
+        self.other_room.delete()
+        self.assertEqual(self.client.get(self.detail_url).data['total_rooms'], 1)
+
+    def test_version_changes_again_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.building.save()
+        # Ответ, построенный до коммита, ложится под промежуточную версию
+        version = data_version()
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(data_version(), version)
+
+    def test_building_list_is_ordered_by_name(self):
+        Building.objects.create(name='Корпус А', address='ул. Тестовая, 1')
+        names = [building['name'] for building in self.client.get(self.list_url).data['results']]
+        self.assertEqual(names, ['Корпус А', 'Корпус Л'])
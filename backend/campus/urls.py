@@ -14,6 +14,9 @@ urlpatterns = [
     path('rooms/<uuid:pk>/', views.RoomDetailView.as_view(), name='room-detail'),
     path('rooms/<uuid:room_id>/statistics/', views.room_statistics, name='room-statistics'),
     
+    # Автодополнение номеров аудиторий и названий корпусов
+    path('autocomplete/', views.campus_autocomplete, name='autocomplete'),
+
     # Отзывы об аудиториях
     path('rooms/<uuid:room_id>/reviews/', views.RoomReviewListCreateView.as_view(), name='room-reviews'),
     path('reviews/<uuid:pk>/', views.RoomReviewDetailView.as_view(), name='review-detail'),
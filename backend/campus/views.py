@@ -1,7 +1,13 @@
-from rest_framework import generics, status, permissions
+from rest_framework import exceptions, generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.db.models import Avg, Count, Q, Sum
+from . import autocomplete
+from api.replicas import replica_reads
+from .cache import data_version, get_response_data, get_room_statistics, set_response_data, set_room_statistics
 from .models import Building, Room, RoomReview
 from .serializers import (
     BuildingListSerializer, BuildingDetailSerializer,
@@ -9,55 +15,101 @@ from .serializers import (
     RoomReviewSerializer, RoomReviewCreateSerializer, RoomReviewUpdateSerializer
 )
 
+# Размер выдачи автодополнения
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
 
-class BuildingListView(generics.ListAPIView):
+
+class CachedResponseMixin:
+    """
+    Кэширует данные успешных GET-ответов до следующего изменения данных кампуса.
+    Права проверяются до обращения к кэшу; ответы не должны зависеть от пользователя
+    """
+
+    def get(self, request, *args, **kwargs):
+        version = data_version()
+        data = get_response_data(version, request)
+        if data is not None:
+            return Response(data)
+
+        # Ответ строится по основной БД: отстающая реплика сохранила бы
+        # под новой версией старые данные
+        with replica_reads(False):
+            response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # Под версией, прочитанной до построения ответа: если данные успели
+            # измениться, ответ ляжет под устаревшую версию и не будет прочитан
+            set_response_data(version, request, response.data)
+        return response
+
+
+class BuildingListView(CachedResponseMixin, generics.ListAPIView):
     """Список корпусов"""
-    queryset = Building.objects.all()
+    # GROUP BY отключает сортировку из Meta, порядок нужен пагинации
+    queryset = Building.objects.annotate(rooms_total=Count('rooms')).order_by('name')
     serializer_class = BuildingListSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class BuildingDetailView(generics.RetrieveAPIView):
+class BuildingDetailView(CachedResponseMixin, generics.RetrieveAPIView):
     """Детальная информация о корпусе"""
-    queryset = Building.objects.all()
+    queryset = Building.objects.annotate(rooms_total=Count('rooms')).prefetch_related('rooms')
     serializer_class = BuildingDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class RoomListView(generics.ListAPIView):
+class RoomListView(CachedResponseMixin, generics.ListAPIView):
     """Список аудиторий"""
     serializer_class = RoomListSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
-        queryset = Room.objects.all()
+    def get_filters(self):
+        """
+        Фильтры по корпусу, этажу и типу аудитории из параметров запроса.
+        Значения приводятся полями модели, как при фильтрации в БД ("02" - этаж 2,
+        UUID в любом регистре), и одинаково сравниваются в запросе и в памяти
+        """
+        params = {'building_id': 'building', 'floor': 'floor', 'room_type': 'type'}
+        filters = {}
+        for field, param in params.items():
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                filters[field] = Room._meta.get_field(field).to_python(value)
+            except ValidationError:
+                raise exceptions.ValidationError({param: 'Некорректное значение'})
+        return filters
 
-        # Фильтрация по корпусу
-        building_id = self.request.query_params.get('building')
-        if building_id:
-            queryset = queryset.filter(building_id=building_id)
+    def get_queryset(self):
+        queryset = Room.objects.select_related('building').filter(**self.get_filters())
+        return queryset.order_by('building__name', 'floor', 'number')
 
-        # Фильтрация по этажу
-        floor = self.request.query_params.get('floor')
-        if floor:
-            queryset = queryset.filter(floor=floor)
+    def list(self, request, *args, **kwargs):
+        search = request.query_params.get('search')
+        if not search:
+            return super().list(request, *args, **kwargs)
 
-        # Фильтрация по типу аудитории
-        room_type = self.request.query_params.get('type')
-        if room_type:
-            queryset = queryset.filter(room_type=room_type)
+        # Поиск по подстроке номера (и названию корпуса) через индекс автодополнения:
+        # фильтры и сортировка применяются к найденным записям в памяти,
+        # из БД читается только текущая страница
+        filters = self.get_filters()
+        entries = [
+            entry for entry in autocomplete.search(search, kinds={autocomplete.ROOM}, limit=None, min_substring=1)
+            if all(entry.data[field] == value for field, value in filters.items())
+        ]
+        entries.sort(key=lambda entry: (entry.data['building_name'], entry.data['floor'], entry.data['number']))
 
-        # Поиск по номеру аудитории
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(number__icontains=search)
-
-        return queryset.order_by('building__name', 'floor', 'number')
+        page = self.paginate_queryset(entries)
+        rooms = Room.objects.select_related('building').in_bulk([entry.id for entry in page])
+        # Аудитория могла быть удалена после построения индекса
+        serializer = self.get_serializer([rooms[entry.id] for entry in page if entry.id in rooms], many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class RoomDetailView(generics.RetrieveAPIView):
     """Детальная информация об аудитории"""
-    queryset = Room.objects.all()
+    queryset = Room.objects.select_related('building')
     serializer_class = RoomDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -99,48 +151,63 @@ class RoomReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.IsAuthenticated()]
 
 
+# Оценки по категориям: ключ в ответе -> поле отзыва
+CATEGORY_RATING_FIELDS = {
+    'cleanliness': 'cleanliness_rating',
+    'equipment': 'equipment_rating',
+    'comfort': 'comfort_rating',
+}
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def room_statistics(request, room_id):
     """Статистика по аудитории"""
-    room = get_object_or_404(Room, id=room_id)
-    reviews = room.reviews.all()
-
-    if not reviews:
-        return Response({
-            'room_id': str(room.id),
+    # Версия читается до подсчета, как в CachedResponseMixin
+    version = data_version()
+    data = get_room_statistics(version, room_id)
+    if data is not None:
+        return Response(data)
+
+    # Один сгруппированный запрос: распределение оценок и средние по категориям
+    aggregates = {
+        'total_reviews': Count('reviews'),
+        'average_rating': Avg('reviews__rating'),
+    }
+    for rating in range(1, 6):
+        aggregates[f'rating_{rating}'] = Count('reviews', filter=Q(reviews__rating=rating))
+    for category, field in CATEGORY_RATING_FIELDS.items():
+        aggregates[category] = Avg(f'reviews__{field}')
+
+    # Статистика кэшируется до изменения отзывов, поэтому считается по основной БД, а не по реплике
+    with replica_reads(False):
+        stats = Room.objects.filter(id=room_id).values('id').annotate(**aggregates).first()
+    if stats is None:
+        raise Http404
+
+    if not stats['total_reviews']:
+        data = {
+            'room_id': str(room_id),
             'total_reviews': 0,
             'average_rating': 0,
             'rating_distribution': {},
             'category_ratings': {}
-        })
-
-    # Распределение оценок
-    rating_distribution = {}
-    for i in range(1, 6):
-        rating_distribution[i] = reviews.filter(rating=i).count()
-
-    # Средние оценки по категориям
-    category_ratings = {}
-    for review in reviews:
-        if review.cleanliness_rating:
-            category_ratings.setdefault('cleanliness', []).append(review.cleanliness_rating)
-        if review.equipment_rating:
-            category_ratings.setdefault('equipment', []).append(review.equipment_rating)
-        if review.comfort_rating:
-            category_ratings.setdefault('comfort', []).append(review.comfort_rating)
-
-    # Вычисляем средние значения
-    for category, ratings in category_ratings.items():
-        category_ratings[category] = sum(ratings) / len(ratings) if ratings else 0
+        }
+    else:
+        data = {
+            'room_id': str(room_id),
+            'total_reviews': stats['total_reviews'],
+            'average_rating': stats['average_rating'],
+            'rating_distribution': {rating: stats[f'rating_{rating}'] for rating in range(1, 6)},
+            'category_ratings': {
+                category: stats[category]
+                for category in CATEGORY_RATING_FIELDS
+                if stats[category] is not None
+            }
+        }
 
-    return Response({
-        'room_id': str(room.id),
-        'total_reviews': reviews.count(),
-        'average_rating': room.average_rating,
-        'rating_distribution': rating_distribution,
-        'category_ratings': category_ratings
-    })
+    set_room_statistics(version, room_id, data)
+    return Response(data)
 
 
 @api_view(['GET'])
@@ -148,37 +215,64 @@ def room_statistics(request, room_id):
 def building_statistics(request, building_id):
     """Статистика по корпусу"""
     building = get_object_or_404(Building, id=building_id)
-    rooms = building.rooms.all()
-
-    total_reviews = sum(room.reviews_count for room in rooms)
-    average_rating = building.average_rating
 
-    # Статистика по типам аудиторий
+    # Статистика по типам аудиторий одним сгруппированным запросом по хранимым агрегатам
+    rows = (
+        Room.objects.filter(building=building)
+        .order_by()
+        .values('room_type')
+        .annotate(
+            count=Count('id'),
+            total_capacity=Sum('capacity'),
+            rating_sum=Sum('rating_sum'),
+            reviews_count=Sum('reviews_count'),
+        )
+    )
+
+    room_type_names = dict(Room.ROOM_TYPES)
     room_types = {}
-    for room in rooms:
-        room_type = room.get_room_type_display()
-        if room_type not in room_types:
-            room_types[room_type] = {
-                'count': 0,
-                'average_rating': 0,
-                'total_capacity': 0
-            }
-        room_types[room_type]['count'] += 1
-        room_types[room_type]['total_capacity'] += room.capacity
-        if room.average_rating > 0:
-            room_types[room_type]['average_rating'] = (
-                room_types[room_type]['average_rating'] + room.average_rating
-            ) / 2 if room_types[room_type]['average_rating'] > 0 else room.average_rating
+    total_rooms = 0
+    for row in rows:
+        total_rooms += row['count']
+        room_types[room_type_names.get(row['room_type'], row['room_type'])] = {
+            'count': row['count'],
+            # Среднее взвешено по числу отзывов, а не по аудиториям
+            'average_rating': row['rating_sum'] / row['reviews_count'] if row['reviews_count'] else 0,
+            'total_capacity': row['total_capacity'],
+            'total_reviews': row['reviews_count'],
+        }
 
     return Response({
         'building_id': str(building.id),
-        'total_rooms': building.total_rooms,
-        'total_reviews': total_reviews,
-        'average_rating': average_rating,
+        'total_rooms': total_rooms,
+        'total_reviews': building.reviews_count,
+        'average_rating': building.average_rating,
         'room_types': room_types
     })
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def campus_autocomplete(request):
+    """Подсказки по номерам аудиторий и названиям корпусов без запросов к БД"""
+    query = request.query_params.get('q', '')
+
+    kinds = {kind for kind in request.query_params.get('type', '').split(',') if kind}
+    if kinds - {autocomplete.ROOM, autocomplete.BUILDING}:
+        return Response({'error': 'Неизвестный тип'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+
+    results = [
+        {'type': entry.kind, 'id': entry.id, 'label': entry.label, **entry.data}
+        for entry in autocomplete.search(query, kinds, limit)
+    ]
+    return Response({'results': results})
+
+
 class IsReviewAuthorOrReadOnly(permissions.BasePermission):
     """Разрешение только для автора отзыва"""
 
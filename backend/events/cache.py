@@ -0,0 +1,73 @@
+"""
+Кэширование календаря событий по месяцам.
+
+Ключи месяцев включают поколение календаря: изменение события, которое
+затрагивает много месяцев (повторяющаяся серия), сбрасывает весь календарь
+одной записью нового поколения вместо перебора месяцев.
+"""
+
+import time
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+CALENDAR_GENERATION_KEY = 'events:calendar:generation'
+
+# Событие, охватывающее больше месяцев, сбрасывает календарь целиком
+MAX_INVALIDATED_MONTHS = 3
+
+
+def calendar_generation():
+    generation = cache.get(CALENDAR_GENERATION_KEY)
+    if generation is None:
+        # Новое поколение уникально, даже если прежнее вытеснено из кэша
+        cache.add(CALENDAR_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(CALENDAR_GENERATION_KEY)
+    return generation
+
+
+def calendar_cache_key(year, month, generation=None):
+    if generation is None:
+        generation = calendar_generation()
+    return f'events:calendar:{generation}:{year}:{month}'
+
+
+def get_calendar_month(year, month):
+    return cache.get(calendar_cache_key(year, month))
+
+
+def set_calendar_month(year, month, data):
+    cache.set(calendar_cache_key(year, month), data, settings.EVENTS_CALENDAR_CACHE_TIMEOUT)
+
+
+def invalidate_calendar():
+    """Сбрасывает все месяцы календаря"""
+    cache.set(CALENDAR_GENERATION_KEY, time.time_ns(), None)
+
+
+def to_month(moment):
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    return moment.year, moment.month
+
+
+def invalidate_calendar_span(start, end):
+    """Сбрасывает месяцы с start по end; end=None - бесконечная серия"""
+    if not isinstance(start, datetime):
+        return
+    if end is None:
+        invalidate_calendar()
+        return
+
+    (year, month), last = to_month(start), to_month(max(start, end))
+    months = []
+    while (year, month) <= last:
+        if len(months) == MAX_INVALIDATED_MONTHS:
+            invalidate_calendar()
+            return
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    generation = calendar_generation()
+    cache.delete_many([calendar_cache_key(year, month, generation) for year, month in months])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the stored participant and waitlist counters of events from EventParticipant rows '
+        'and move waitlisted users into free seats'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding event participant counters...')
+        updated = Event.objects.rebuild_participants_count()
+        # Seats freed by the corrected counters go to the waitlists
+        promoted = Event.objects.fill_seats_from_waitlist()
+        self.stdout.write(self.style.SUCCESS(
+            f'Fixed participant counters of {updated} event(s), promoted {promoted} waitlisted user(s)'
+        ))
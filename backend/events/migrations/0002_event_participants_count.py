@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_participants_count(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventParticipant = apps.get_model('events', 'EventParticipant')
+
+    participants = (
+        EventParticipant.objects.filter(event=OuterRef('pk'))
+        .order_by()
+        .values('event')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Event.objects.update(participants_count=Coalesce(Subquery(participants), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='participants_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Number of participants'),
+        ),
+        migrations.RunPython(fill_participants_count, migrations.RunPython.noop),
+    ]
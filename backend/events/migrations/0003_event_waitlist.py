@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-17 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_participants_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='waitlist_tail',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Last waitlist ticket'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='waitlist_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Users on the waitlist'),
+        ),
+        migrations.AddField(
+            model_name='eventparticipant',
+            name='waitlist_position',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Позиция в листе ожидания'),
+        ),
+        migrations.AlterField(
+            model_name='eventparticipant',
+            name='status',
+            field=models.CharField(choices=[('registered', 'Зарегистрирован'), ('confirmed', 'Подтвержден'), ('attended', 'Присутствовал'), ('cancelled', 'Отменен'), ('waitlisted', 'В листе ожидания')], default='registered', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='eventparticipant',
+            index=models.Index(fields=['event', 'waitlist_position'], name='participant_waitlist_idx'),
+        ),
+    ]
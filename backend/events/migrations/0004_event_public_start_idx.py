@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-17 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_waitlist'),
+    ]
+
+    operations = [
+        # Partial rather than led by is_public: SQLite cannot match the bare
+        # boolean `WHERE is_public` to a leading index column
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['start_datetime'], name='event_public_start_idx'),
+        ),
+    ]
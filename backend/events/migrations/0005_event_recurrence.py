@@ -0,0 +1,51 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:00
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
+
+
+def fill_series_end(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    # Existing events do not repeat, so the series ends with the event itself
+    Event.objects.update(series_end=Greatest(F('start_datetime'), Coalesce(F('end_datetime'), F('start_datetime'))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_event_public_start_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_frequency',
+            field=models.CharField(blank=True, choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='', max_length=10, verbose_name='Repeats'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Repeat every'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_count',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Number of occurrences'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Repeat until'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='series_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Series end'),
+        ),
+        migrations.RunPython(fill_series_end, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['series_end'], name='event_public_series_end_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['category', 'start_datetime'], name='event_public_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventparticipant',
+            index=models.Index(fields=['event', 'registered_at', 'id'], name='participant_registered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventreview',
+            index=models.Index(fields=['event', '-created_at', '-id'], name='event_review_created_id_idx'),
+        ),
+    ]
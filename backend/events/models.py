@@ -1,12 +1,190 @@
-from django.db import models
+from datetime import timedelta
+from functools import partial
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
 from posts.models import Post
+from .cache import invalidate_calendar_span
+from .recurrence import DAILY, MONTHLY, WEEKLY, RecurrenceRule, day_range, occurrences
 import uuid
 
 
+def has_free_seat():
+    # An empty or zero limit means the event is unlimited
+    return (
+        models.Q(max_participants__isnull=True) |
+        models.Q(max_participants=0) |
+        models.Q(participants_count__lt=models.F('max_participants'))
+    )
+
+
+class EventQuerySet(models.QuerySet):
+    def overlapping(self, window_start, window_end):
+        """
+        Events with at least one occurrence that may fall into [window_start, window_end).
+        Uses the stored series_end, so recurring series are found without expanding them.
+        """
+        return self.filter(start_datetime__lt=window_end).filter(
+            models.Q(series_end__gte=window_start) | models.Q(series_end__isnull=True)
+        )
+
+    def occurring(self, window_start, window_end):
+        """
+        Events with an occurrence overlapping [window_start, window_end). Candidates come from
+        overlapping(); recurring series among them are expanded to drop the ones that skip the window
+        """
+        candidates = self.overlapping(window_start, window_end).only(
+            'id', 'start_datetime', 'end_datetime',
+            'recurrence_frequency', 'recurrence_interval', 'recurrence_count', 'recurrence_until',
+        )
+        return self.filter(pk__in=[
+            event.pk for event in candidates
+            if next(event.occurrences_between(window_start, window_end), None) is not None
+        ])
+
+    def upcoming(self, moment=None):
+        """Events starting from `moment`, plus recurring series that still have occurrences ahead"""
+        moment = moment or timezone.now()
+        # "series_end >= moment OR series_end IS NULL" is not one index range, and SQLite walks
+        # the whole index for it; a UNION ALL of the two ranges finds the candidates by index.
+        # Single events that already started are dropped after it
+        running = Event.objects.filter(is_public=True, series_end__gte=moment).order_by().values('pk').union(
+            Event.objects.filter(is_public=True, series_end__isnull=True).order_by().values('pk'), all=True
+        )
+        return self.filter(pk__in=running).exclude(recurrence_frequency='', start_datetime__lt=moment)
+
+    def reserve_seat(self, event_id):
+        """
+        Atomically takes a seat with a conditional UPDATE ... WHERE count < max,
+        so concurrent joins can never oversubscribe the event. Returns False when it is full.
+        """
+        return bool(
+            self.filter(has_free_seat(), pk=event_id).update(participants_count=models.F('participants_count') + 1)
+        )
+
+    def release_seat(self, event_id):
+        self.filter(pk=event_id, participants_count__gt=0).update(
+            participants_count=models.F('participants_count') - 1
+        )
+
+    def enqueue_waitlist(self, event_id):
+        """
+        Issues the next waitlist ticket. Returns (ticket, place), where place counts
+        everyone waiting including the new entry, i.e. the caller's place in the queue.
+        """
+        self.filter(pk=event_id).update(
+            waitlist_tail=models.F('waitlist_tail') + 1,
+            waitlist_count=models.F('waitlist_count') + 1,
+        )
+        return self.filter(pk=event_id).values_list('waitlist_tail', 'waitlist_count').get()
+
+    def dequeue_waitlist(self, event_id):
+        self.filter(pk=event_id, waitlist_count__gt=0).update(
+            waitlist_count=models.F('waitlist_count') - 1
+        )
+
+    def rebuild_participants_count(self):
+        """Recomputes the denormalized participant and waitlist counters from EventParticipant rows in bulk"""
+        def count(participants):
+            return Coalesce(
+                models.Subquery(
+                    participants.filter(event=models.OuterRef('pk'))
+                    .order_by()
+                    .values('event')
+                    .annotate(total=models.Count('id'))
+                    .values('total')
+                ),
+                0
+            )
+
+        seated = count(EventParticipant.objects.seated())
+        waiting = count(EventParticipant.objects.waitlisted())
+        return self.exclude(participants_count=seated, waitlist_count=waiting).update(
+            participants_count=seated, waitlist_count=waiting
+        )
+
+    def fill_seats_from_waitlist(self):
+        """Moves waitlisted users into the free seats of these events; returns how many were promoted"""
+        promoted = 0
+        for event in self.filter(has_free_seat(), waitlist_count__gt=0).only('id', 'requires_registration'):
+            while Event.objects.reserve_seat(event.pk):
+                if EventParticipant.objects.promote_next(event) is None:
+                    Event.objects.release_seat(event.pk)
+                    break
+                promoted += 1
+        return promoted
+
+    def with_list_data(self, user=None):
+        """Annotates counters and the caller's participation so list rows need no extra queries"""
+        ratings = (
+            EventReview.objects.filter(event=models.OuterRef('pk'))
+            .order_by()
+            .values('event')
+            .annotate(average=models.Avg('rating'))
+            .values('average')
+        )
+
+        queryset = self.select_related('organizer__profile').annotate(
+            rating_avg=Coalesce(models.Subquery(ratings, output_field=models.FloatField()), 0.0),
+        )
+
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(
+                joined_by_user=models.Exists(
+                    EventParticipant.objects.seated().filter(event=models.OuterRef('pk'), user=user)
+                )
+            )
+        return queryset
+
+    def with_detail_data(self, user=None, preview=10):
+        """
+        Adds summary counters, the caller's participation status and only the
+        first `preview` participants and reviews; the rest are paginated separately.
+        """
+        reviews = (
+            EventReview.objects.filter(event=models.OuterRef('pk'))
+            .order_by()
+            .values('event')
+            .annotate(total=models.Count('id'))
+            .values('total')
+        )
+        queryset = self.with_list_data(user).annotate(
+            reviews_total=Coalesce(models.Subquery(reviews), 0),
+        ).prefetch_related(
+            models.Prefetch(
+                'event_participants',
+                queryset=EventParticipant.objects.seated().select_related('user__profile')
+                .order_by('registered_at', 'id')[:preview],
+                to_attr='first_participants',
+            ),
+            models.Prefetch(
+                'reviews',
+                queryset=EventReview.objects.select_related('author__profile')
+                .order_by('-created_at', '-id')[:preview],
+                to_attr='first_reviews',
+            ),
+        )
+
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(
+                participation_status=models.Subquery(
+                    EventParticipant.objects.filter(event=models.OuterRef('pk'), user=user).values('status')[:1]
+                )
+            )
+        return queryset
+
+
 class Event(models.Model):
     """Model for university and personal events"""
+    RECURRENCE_FREQUENCIES = [
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+        (MONTHLY, 'Monthly'),
+    ]
+
     EVENT_CATEGORIES = [
         ('university', 'University'),
         ('personal', 'Personal'),
@@ -30,6 +208,14 @@ class Event(models.Model):
     end_datetime = models.DateTimeField(null=True, blank=True, verbose_name="End date and time")
     location = models.CharField(max_length=200, blank=True, verbose_name="Location")
 
+    # Recurrence (RRULE subset: FREQ, INTERVAL, COUNT, UNTIL); occurrences are expanded on read
+    recurrence_frequency = models.CharField(max_length=10, choices=RECURRENCE_FREQUENCIES, blank=True, default='', verbose_name="Repeats")
+    recurrence_interval = models.PositiveSmallIntegerField(default=1, verbose_name="Repeat every")
+    recurrence_count = models.PositiveIntegerField(null=True, blank=True, verbose_name="Number of occurrences")
+    recurrence_until = models.DateTimeField(null=True, blank=True, verbose_name="Repeat until")
+    # End of the last occurrence (empty for endless series), kept up to date in save()
+    series_end = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Series end")
+
     # Relations
     organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='organized_events', verbose_name="Organizer")
     participants = models.ManyToManyField(User, through='EventParticipant', related_name='events', blank=True)
@@ -39,47 +225,154 @@ class Event(models.Model):
     max_participants = models.PositiveIntegerField(null=True, blank=True, verbose_name="Maximum participants")
     is_public = models.BooleanField(default=True, verbose_name="Public event")
     requires_registration = models.BooleanField(default=False, verbose_name="Requires registration")
+    participants_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Number of participants")
+
+    # Waitlist: the last issued ticket and the number of users still waiting
+    waitlist_tail = models.PositiveIntegerField(default=0, editable=False, verbose_name="Last waitlist ticket")
+    waitlist_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Users on the waitlist")
 
     # System fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EventQuerySet.as_manager()
+
     class Meta:
         ordering = ['start_datetime']
+        # Partial indexes over public events: `is_public` is a bare boolean term
+        # in the WHERE clause, which SQLite cannot match to a leading index column
+        indexes = [
+            # Month calendar and date filters: start_datetime ranges
+            models.Index(fields=['start_datetime'], condition=models.Q(is_public=True), name='event_public_start_idx'),
+            # Calendar and "upcoming": series that have not ended yet
+            models.Index(fields=['series_end'], condition=models.Q(is_public=True), name='event_public_series_end_idx'),
+            # Event list filtered by category
+            models.Index(
+                fields=['category', 'start_datetime'], condition=models.Q(is_public=True), name='event_public_category_idx'
+            ),
+        ]
         verbose_name = "Event"
         verbose_name_plural = "Events"
 
     def __str__(self):
         return f"{self.title} - {self.start_datetime.strftime('%d.%m.%Y %H:%M')}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored span to invalidate the old calendar months when it moves
+        instance._loaded_span = (instance.__dict__.get('start_datetime'), instance.__dict__.get('series_end'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.series_end = self.compute_series_end()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'series_end' not in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'series_end'}
+        super().save(*args, **kwargs)
+
     @property
-    def participants_count(self):
-        return self.participants.count()
+    def recurrence(self):
+        return RecurrenceRule.from_fields(
+            self.recurrence_frequency, self.recurrence_interval, self.recurrence_count, self.recurrence_until
+        )
+
+    @property
+    def is_recurring(self):
+        return bool(self.recurrence_frequency)
+
+    @property
+    def duration(self):
+        if self.end_datetime and self.end_datetime > self.start_datetime:
+            return self.end_datetime - self.start_datetime
+        return timedelta(0)
+
+    def compute_series_end(self):
+        rule = self.recurrence
+        if rule is None:
+            return self.start_datetime + self.duration
+        last_start = rule.last_start(self.start_datetime)
+        if last_start is None:
+            return None
+        return last_start + self.duration
+
+    def occurrences_between(self, window_start, window_end):
+        """Lazily yields (start, end) of the occurrences overlapping the window"""
+        return occurrences(self.start_datetime, self.end_datetime, self.recurrence, window_start, window_end)
+
+    @property
+    def next_occurrence(self):
+        """Start of the next occurrence from now, None when the event or series is over"""
+        now = timezone.now()
+        rule = self.recurrence
+        if rule is None:
+            return self.start_datetime if self.start_datetime >= now else None
+        return rule.next_after(self.start_datetime, now)
+
+    @property
+    def reviews_count(self):
+        if hasattr(self, 'reviews_total'):
+            return self.reviews_total
+        return self.reviews.count()
 
     @property
     def is_past(self):
-        return self.start_datetime < timezone.now()
+        """The event has started, or for a series: no occurrences are left"""
+        return self.next_occurrence is None
 
     @property
     def is_today(self):
-        today = timezone.now().date()
-        return self.start_datetime.date() == today
+        """An occurrence of the event overlaps the current local day"""
+        return next(self.occurrences_between(*day_range(timezone.localdate())), None) is not None
 
     @property
     def average_rating(self):
+        if hasattr(self, 'rating_avg'):
+            return self.rating_avg
         reviews = self.reviews.all()
         if reviews:
             return sum(review.rating for review in reviews) / len(reviews)
         return 0
 
 
+class EventParticipantQuerySet(models.QuerySet):
+    def seated(self):
+        return self.exclude(status__in=[EventParticipant.WAITLISTED, EventParticipant.CANCELLED])
+
+    def waitlisted(self):
+        return self.filter(status=EventParticipant.WAITLISTED)
+
+    def promote_next(self, event):
+        """
+        Moves the head of the event's waitlist into the freed seat.
+        The head is found through the (event, waitlist_position) index, and the
+        conditional UPDATE makes concurrent promotions of the same entry harmless.
+        """
+        status = 'registered' if event.requires_registration else 'confirmed'
+        while True:
+            head = self.waitlisted().filter(event=event).order_by('waitlist_position').first()
+            if head is None:
+                return None
+            promoted = self.filter(pk=head.pk, status=EventParticipant.WAITLISTED).update(
+                status=status, waitlist_position=None
+            )
+            if promoted:
+                Event.objects.dequeue_waitlist(event.pk)
+                head.status, head.waitlist_position = status, None
+                return head
+
+
 class EventParticipant(models.Model):
     """Модель для участников событий"""
+    WAITLISTED = 'waitlisted'
+    CANCELLED = 'cancelled'
+
     PARTICIPATION_STATUS = [
         ('registered', 'Зарегистрирован'),
         ('confirmed', 'Подтвержден'),
         ('attended', 'Присутствовал'),
-        ('cancelled', 'Отменен'),
+        (CANCELLED, 'Отменен'),
+        (WAITLISTED, 'В листе ожидания'),
     ]
 
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='event_participants')
@@ -87,15 +380,31 @@ class EventParticipant(models.Model):
     status = models.CharField(max_length=20, choices=PARTICIPATION_STATUS, default='registered')
     registered_at = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True, verbose_name="Заметки")
+    # Номер в очереди ожидания, заполнен только у статуса waitlisted
+    waitlist_position = models.PositiveIntegerField(null=True, blank=True, verbose_name="Позиция в листе ожидания")
+
+    objects = EventParticipantQuerySet.as_manager()
 
     class Meta:
         unique_together = ('event', 'user')
+        indexes = [
+            models.Index(fields=['event', 'waitlist_position'], name='participant_waitlist_idx'),
+            # Участники события в порядке регистрации (пагинация по ключу)
+            models.Index(fields=['event', 'registered_at', 'id'], name='participant_registered_idx'),
+        ]
         verbose_name = "Участник события"
         verbose_name_plural = "Участники событий"
 
     def __str__(self):
         return f"{self.user.username} - {self.event.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status to move the event counters when it changes
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
 
 class EventReview(models.Model):
     """Модель для отзывов на мероприятия"""
@@ -118,8 +427,125 @@ class EventReview(models.Model):
     class Meta:
         unique_together = ('event', 'author')
         ordering = ['-created_at']
+        indexes = [
+            # Отзывы события от новых к старым (пагинация по ключу)
+            models.Index(fields=['event', '-created_at', '-id'], name='event_review_created_id_idx'),
+        ]
         verbose_name = "Отзыв на событие"
         verbose_name_plural = "Отзывы на события"
 
     def __str__(self):
         return f"Отзыв {self.author.username} на {self.event.title} - {self.rating}/5"
+
+
+def invalidate_calendar_spans(*spans):
+    for span in spans:
+        invalidate_calendar_span(*span)
+
+
+def refresh_calendar(*spans):
+    # Right away, so that this connection never reads its own change from the cache,
+    # and again after commit: a month built by another request before the commit
+    # (from the old data) is cached again and gets dropped
+    invalidate_calendar_spans(*spans)
+    transaction.on_commit(partial(invalidate_calendar_spans, *spans))
+
+
+@receiver(post_save, sender=Event)
+def refresh_calendar_on_save(sender, instance, **kwargs):
+    """Drops the cached calendar months the event was and is now in"""
+    span = (instance.start_datetime, instance.series_end)
+    loaded_span = getattr(instance, '_loaded_span', None)
+    if loaded_span is None:
+        refresh_calendar(span)
+    else:
+        refresh_calendar(loaded_span, span)
+    instance._loaded_span = span
+
+
+@receiver(post_delete, sender=Event)
+def refresh_calendar_on_delete(sender, instance, **kwargs):
+    refresh_calendar(getattr(instance, '_loaded_span', (instance.start_datetime, instance.series_end)))
+
+
+def vacate_seat(event_id):
+    """A seated participant is gone: the seat goes to the head of the waitlist or is released"""
+    event = Event.objects.filter(pk=event_id).only('id', 'requires_registration').first()
+    if event is not None and EventParticipant.objects.promote_next(event) is None:
+        Event.objects.release_seat(event_id)
+
+
+SEAT, WAITLIST = 'seat', 'waitlist'
+
+
+def participation_place(status):
+    """What a participation with this status holds: a seat, a waitlist place or nothing (cancelled)"""
+    if status == EventParticipant.CANCELLED:
+        return None
+    return WAITLIST if status == EventParticipant.WAITLISTED else SEAT
+
+
+def take_seat_or_queue(participant):
+    if participant.status == EventParticipant.WAITLISTED or not Event.objects.reserve_seat(participant.event_id):
+        # No free seat: queue instead of oversubscribing the event
+        ticket, place = Event.objects.enqueue_waitlist(participant.event_id)
+        EventParticipant.objects.filter(pk=participant.pk).update(
+            status=EventParticipant.WAITLISTED, waitlist_position=ticket
+        )
+        participant.status, participant.waitlist_position = EventParticipant.WAITLISTED, ticket
+        # Place in the queue at the moment of joining, for the response
+        participant.waitlist_place = place
+
+
+def release_participation(event_id, place):
+    if place == WAITLIST:
+        Event.objects.dequeue_waitlist(event_id)
+    elif place == SEAT:
+        vacate_seat(event_id)
+
+
+@receiver(post_save, sender=EventParticipant)
+def add_participant_to_counters(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Keeps participants_count and the waitlist counters in step with EventParticipant rows,
+    whichever way they are saved (views, admin, shell)
+    """
+    if raw:
+        return
+
+    if created:
+        if instance.status != EventParticipant.CANCELLED:
+            take_seat_or_queue(instance)
+    elif update_fields is None or 'status' in update_fields:
+        loaded_status = getattr(instance, '_loaded_status', None)
+        before, after = participation_place(loaded_status), participation_place(instance.status)
+        if loaded_status is None or {before, after} == {SEAT, WAITLIST}:
+            # Moved between the seats and the waitlist by hand, or the previous status
+            # is unknown: recount this event and fill its seats
+            events = Event.objects.filter(pk=instance.event_id)
+            events.rebuild_participants_count()
+            events.fill_seats_from_waitlist()
+        elif before is not None and after is None:
+            # Cancelled: give up the seat or the waitlist place
+            release_participation(instance.event_id, before)
+            if before == WAITLIST:
+                EventParticipant.objects.filter(pk=instance.pk).update(waitlist_position=None)
+                instance.waitlist_position = None
+        elif before is None and after is not None:
+            # Restored from cancelled: joins again, like a new participation
+            take_seat_or_queue(instance)
+
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=EventParticipant)
+def remove_participant_from_counters(sender, instance, origin=None, **kwargs):
+    """
+    Frees the seat or the waitlist place of a deleted participation, including cascades
+    from a deleted user and deletes from the admin
+    """
+    # The event itself is being deleted together with its counters
+    if isinstance(origin, Event) or getattr(origin, 'model', None) is Event:
+        return
+
+    release_participation(instance.event_id, participation_place(getattr(instance, '_loaded_status', instance.status)))
@@ -0,0 +1,154 @@
+"""
+Развертывание повторяющихся событий.
+
+Правило повторения - подмножество RRULE: частота (FREQ), интервал (INTERVAL),
+число повторений (COUNT) и граница (UNTIL). Повторения не хранятся в БД,
+а вычисляются для запрошенного окна: номер первого подходящего повторения
+находится арифметически, поэтому стоимость зависит от размера окна,
+а не от того, сколько повторений было до него.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+from django.utils import timezone
+
+DAILY = 'daily'
+WEEKLY = 'weekly'
+MONTHLY = 'monthly'
+
+STEP_DAYS = {DAILY: 1, WEEKLY: 7}
+
+
+def to_local(moment):
+    """Время в текущей зоне без tzinfo: шаги считаются по "настенным" часам"""
+    if timezone.is_aware(moment):
+        return timezone.localtime(moment).replace(tzinfo=None)
+    return moment
+
+
+def from_local(moment):
+    return timezone.make_aware(moment)
+
+
+def month_range(year, month):
+    """Полуоткрытый диапазон [начало месяца, начало следующего) в текущей временной зоне"""
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1))
+    return start, end
+
+
+def day_range(day):
+    """Полуоткрытый диапазон [начало дня, начало следующего) в текущей временной зоне"""
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+    return start, end
+
+
+def add_months(moment, months):
+    """Сдвигает дату на месяцы, прижимая день к концу короткого месяца (31 января -> 28 февраля)"""
+    month_index = moment.month - 1 + months
+    year = moment.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def overlaps(start, end, window_start, window_end):
+    """Пересекается ли [start, end) с окном; событие без длительности - точка start"""
+    if start >= window_end:
+        return False
+    return end > window_start or start >= window_start
+
+
+class RecurrenceRule:
+    """Правило повторения серии, начинающейся в момент start"""
+
+    def __init__(self, frequency, interval=1, count=None, until=None):
+        self.frequency = frequency
+        self.interval = max(interval or 1, 1)
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def from_fields(cls, frequency, interval=1, count=None, until=None):
+        """Правило из полей события или None для неповторяющегося события"""
+        if not frequency:
+            return None
+        return cls(frequency, interval, count, until)
+
+    def nth(self, start, index):
+        """Начало повторения с номером index (с нуля)"""
+        local = to_local(start)
+        if self.frequency == MONTHLY:
+            occurrence = add_months(local, index * self.interval)
+        else:
+            occurrence = local + timedelta(days=STEP_DAYS[self.frequency] * self.interval * index)
+        return from_local(occurrence)
+
+    def first_index_from(self, start, moment):
+        """Номер первого повторения, начинающегося не раньше moment"""
+        if moment <= start:
+            return 0
+
+        local_start, local_moment = to_local(start), to_local(moment)
+        if self.frequency == MONTHLY:
+            months = (local_moment.year - local_start.year) * 12 + local_moment.month - local_start.month
+            index = months // self.interval
+        else:
+            step = timedelta(days=STEP_DAYS[self.frequency] * self.interval)
+            index = (local_moment - local_start) // step
+
+        # Оценка может отличаться на шаг из-за прижатия дней и перевода часов
+        index = max(index - 1, 0)
+        while self.nth(start, index) < moment:
+            index += 1
+        return index
+
+    def is_valid_index(self, index, occurrence):
+        if self.count is not None and index >= self.count:
+            return False
+        return self.until is None or occurrence <= self.until
+
+    def between(self, start, duration, window_start, window_end):
+        """Лениво выдает (начало, конец) повторений, пересекающих окно [window_start, window_end)"""
+        index = self.first_index_from(start, window_start - duration)
+        while True:
+            occurrence = self.nth(start, index)
+            if occurrence >= window_end or not self.is_valid_index(index, occurrence):
+                return
+            if overlaps(occurrence, occurrence + duration, window_start, window_end):
+                yield occurrence, occurrence + duration
+            index += 1
+
+    def next_after(self, start, moment):
+        """Первое повторение, начинающееся не раньше moment, или None, если серия закончилась"""
+        index = self.first_index_from(start, moment)
+        occurrence = self.nth(start, index)
+        if self.is_valid_index(index, occurrence):
+            return occurrence
+        return None
+
+    def last_start(self, start):
+        """Начало последнего повторения или None для бесконечной серии"""
+        last = None
+        if self.count is not None:
+            last = self.nth(start, max(self.count - 1, 0))
+        if self.until is not None and (last is None or last > self.until):
+            index = self.first_index_from(start, self.until)
+            if self.nth(start, index) > self.until:
+                index -= 1
+            last = self.nth(start, max(index, 0))
+        return last
+
+
+def occurrences(start, end, rule, window_start, window_end):
+    """Повторения события (или само событие при rule=None), пересекающие окно"""
+    duration = end - start if end and end > start else timedelta(0)
+    if rule is None:
+        if overlaps(start, start + duration, window_start, window_end):
+            yield start, start + duration
+        return
+    yield from rule.between(start, duration, window_start, window_end)
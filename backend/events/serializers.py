@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import Event, EventParticipant, EventReview
 from accounts.models import UserProfile
@@ -38,7 +39,9 @@ class EventParticipantSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = EventParticipant
-        fields = ['user', 'status', 'registered_at', 'notes']
+        # waitlist_position - номер в очереди ожидания, у занявших место пустой
+        fields = ['user', 'status', 'registered_at', 'notes', 'waitlist_position']
+        read_only_fields = ['waitlist_position']
 
 
 class EventReviewSerializer(serializers.ModelSerializer):
@@ -65,6 +68,7 @@ class EventListSerializer(serializers.ModelSerializer):
     average_rating = serializers.ReadOnlyField()
     is_past = serializers.ReadOnlyField()
     is_today = serializers.ReadOnlyField()
+    next_occurrence = serializers.DateTimeField(read_only=True)
     user_is_participant = serializers.SerializerMethodField()
 
     class Meta:
@@ -73,6 +77,7 @@ class EventListSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'category', 'start_datetime', 'end_datetime',
             'location', 'organizer', 'participants_count', 'average_rating',
             'is_public', 'requires_registration', 'max_participants',
+            'recurrence_frequency', 'next_occurrence',
             'is_past', 'is_today', 'user_is_participant', 'created_at'
         ]
 
@@ -80,7 +85,10 @@ class EventListSerializer(serializers.ModelSerializer):
         """Проверяет, является ли текущий пользователь участником события"""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.participants.filter(id=request.user.id).exists()
+            # Список событий аннотирует участие в основном запросе
+            if hasattr(obj, 'joined_by_user'):
+                return obj.joined_by_user
+            return obj.event_participants.seated().filter(user=request.user).exists()
         return False
 
 
@@ -88,12 +96,17 @@ class EventDetailSerializer(serializers.ModelSerializer):
     """Детальный сериализатор для события"""
     organizer = EventOrganizerSerializer(read_only=True)
     organizer_id = serializers.IntegerField(write_only=True, required=False)
-    participants = EventParticipantSerializer(source='event_participants', many=True, read_only=True)
-    reviews = EventReviewSerializer(many=True, read_only=True)
+    participants = serializers.SerializerMethodField()
+    reviews = serializers.SerializerMethodField()
     participants_count = serializers.ReadOnlyField()
+    waitlist_count = serializers.ReadOnlyField()
+    reviews_count = serializers.ReadOnlyField()
     average_rating = serializers.ReadOnlyField()
     is_past = serializers.ReadOnlyField()
     is_today = serializers.ReadOnlyField()
+    next_occurrence = serializers.DateTimeField(read_only=True)
+    recurrence_interval = serializers.IntegerField(min_value=1, required=False)
+    recurrence_count = serializers.IntegerField(min_value=1, required=False, allow_null=True)
     user_is_participant = serializers.SerializerMethodField()
     user_participation_status = serializers.SerializerMethodField()
 
@@ -102,23 +115,61 @@ class EventDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'category', 'start_datetime', 'end_datetime',
             'location', 'organizer', 'organizer_id', 'participants', 'reviews',
-            'participants_count', 'average_rating', 'is_public', 'requires_registration',
+            'participants_count', 'waitlist_count', 'reviews_count', 'average_rating', 'is_public', 'requires_registration',
             'max_participants', 'related_post', 'is_past', 'is_today',
+            'recurrence_frequency', 'recurrence_interval', 'recurrence_count', 'recurrence_until', 'next_occurrence',
             'user_is_participant', 'user_participation_status', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def validate(self, attrs):
+        """Проверяет согласованность правила повторения"""
+        def value(field):
+            if field in attrs:
+                return attrs[field]
+            return getattr(self.instance, field, None)
+
+        if not value('recurrence_frequency') and (value('recurrence_count') or value('recurrence_until')):
+            raise serializers.ValidationError({'recurrence_frequency': 'Укажите частоту повторения'})
+
+        start, until = value('start_datetime'), value('recurrence_until')
+        if start and until and until < start:
+            raise serializers.ValidationError({'recurrence_until': 'Повторение не может закончиться до начала события'})
+        return attrs
+
+    def get_participants(self, obj):
+        """Первая страница участников, полный список - /api/events/<id>/participants/"""
+        participants = getattr(obj, 'first_participants', None)
+        if participants is None:
+            participants = obj.event_participants.seated().select_related('user__profile').order_by(
+                'registered_at', 'id'
+            )[:settings.EVENT_DETAIL_PREVIEW_SIZE]
+        return EventParticipantSerializer(participants, many=True, context=self.context).data
+
+    def get_reviews(self, obj):
+        """Последние отзывы, полный список - /api/events/<id>/reviews/"""
+        reviews = getattr(obj, 'first_reviews', None)
+        if reviews is None:
+            reviews = obj.reviews.select_related('author__profile').order_by(
+                '-created_at', '-id'
+            )[:settings.EVENT_DETAIL_PREVIEW_SIZE]
+        return EventReviewSerializer(reviews, many=True, context=self.context).data
+
     def get_user_is_participant(self, obj):
         """Проверяет, является ли текущий пользователь участником события"""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.participants.filter(id=request.user.id).exists()
+            if hasattr(obj, 'joined_by_user'):
+                return obj.joined_by_user
+            return obj.event_participants.seated().filter(user=request.user).exists()
         return False
 
     def get_user_participation_status(self, obj):
         """Возвращает статус участия текущего пользователя"""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, 'participation_status'):
+                return obj.participation_status
             participation = obj.event_participants.filter(user=request.user).first()
             return participation.status if participation else None
         return None
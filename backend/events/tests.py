@@ -1,3 +1,706 @@
-from django.test import TestCase
+import random
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from api.testing import QueryPlanAssertionsMixin
+from .models import Event, EventParticipant, EventReview
+from .recurrence import DAILY, MONTHLY, WEEKLY, RecurrenceRule
+from .views import join_event
 
-# Create your tests here.
+
+class EventsTestCase(APITestCase):
+    """Общая подготовка данных для тестов событий"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student')
+        self.organizer = User.objects.create_user(username='organizer')
+        self.client.force_authenticate(self.user)
+
+    def create_event(self, **kwargs):
+        kwargs.setdefault('title', 'Событие')
+        kwargs.setdefault('organizer', self.organizer)
+        kwargs.setdefault('start_datetime', timezone.now() + timedelta(days=1))
+        return Event.objects.create(**kwargs)
+
+    def add_participant(self, event, user, **kwargs):
+        # Счетчики участников обновляет сигнал post_save
+        return EventParticipant.objects.create(event=event, user=user, **kwargs)
+
+
+class EventListQueryCountTests(EventsTestCase):
+    """Список событий собирается фиксированным числом запросов"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('api:events:event-list-create')
+
+    def populate(self, count):
+        guests = [User.objects.create_user(username=f'guest{len(self.created)}_{i}') for i in range(2)]
+        for _ in range(count):
+            event = self.create_event(title=f'Событие {len(self.created)}')
+            for guest in guests:
+                self.add_participant(event, guest)
+            EventReview.objects.create(event=event, author=guests[0], rating=4)
+            EventReview.objects.create(event=event, author=guests[1], rating=5)
+            self.created.append(event)
+
+    def test_query_count_does_not_grow_with_events(self):
+        self.created = []
+        self.populate(2)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        self.populate(5)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data['results']), 7)
+
+    def test_annotated_fields(self):
+        joined = self.create_event(title='С участием')
+        self.add_participant(joined, self.user)
+        EventReview.objects.create(event=joined, author=self.user, rating=3)
+        EventReview.objects.create(event=joined, author=self.organizer, rating=4)
+        self.create_event(title='Пустое')
+
+        response = self.client.get(self.url)
+
+        rows = {row['title']: row for row in response.data['results']}
+        self.assertEqual(rows['С участием']['participants_count'], 1)
+        self.assertEqual(rows['С участием']['average_rating'], 3.5)
+        self.assertTrue(rows['С участием']['user_is_participant'])
+        self.assertEqual(rows['Пустое']['participants_count'], 0)
+        self.assertEqual(rows['Пустое']['average_rating'], 0)
+        self.assertFalse(rows['Пустое']['user_is_participant'])
+
+    def test_properties_without_annotations(self):
+        event = self.create_event()
+        self.add_participant(event, self.user)
+        EventReview.objects.create(event=event, author=self.user, rating=2)
+
+        event = Event.objects.get(pk=event.pk)
+
+        self.assertEqual(event.participants_count, 1)
+        self.assertEqual(event.average_rating, 2)
+
+
+@override_settings(EVENT_DETAIL_PREVIEW_SIZE=2)
+class EventDetailPayloadTests(EventsTestCase):
+    """Карточка события содержит только первую страницу участников и отзывов"""
+
+    def setUp(self):
+        super().setUp()
+        self.event = self.create_event()
+        self.guests = [User.objects.create_user(username=f'guest{i}') for i in range(5)]
+        for guest in self.guests:
+            self.add_participant(self.event, guest)
+            EventReview.objects.create(event=self.event, author=guest, rating=4)
+        self.url = reverse('api:events:event-detail', args=[self.event.id])
+
+    def test_detail_is_bounded(self):
+        self.add_participant(self.event, self.user, status='registered')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data['participants']), 2)
+        self.assertEqual(len(response.data['reviews']), 2)
+        self.assertEqual(response.data['participants_count'], 6)
+        self.assertEqual(response.data['reviews_count'], 5)
+        self.assertTrue(response.data['user_is_participant'])
+        self.assertEqual(response.data['user_participation_status'], 'registered')
+        self.assertEqual(
+            [row['user']['username'] for row in response.data['participants']],
+            ['guest0', 'guest1']
+        )
+
+    def test_participants_are_paginated(self):
+        url = reverse('api:events:event-participants', args=[self.event.id]) + '?page_size=2'
+
+        usernames = []
+        while url:
+            response = self.client.get(url)
+            usernames += [row['user']['username'] for row in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(usernames, [guest.username for guest in self.guests])
+
+    def test_participants_of_missing_event(self):
+        response = self.client.get(reverse('api:events:event-participants', args=[uuid.uuid4()]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_reviews_use_cursor_pagination(self):
+        url = reverse('api:events:event-reviews', args=[self.event.id])
+
+        response = self.client.get(url, {'page_size': 3})
+
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertNotIn('count', response.data)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+
+class JoinEventTests(EventsTestCase):
+    """Участие в событии и хранимый счетчик участников"""
+
+    def setUp(self):
+        super().setUp()
+        self.event = self.create_event(max_participants=1)
+        self.join_url = reverse('api:events:join-event', args=[self.event.id])
+        self.leave_url = reverse('api:events:leave-event', args=[self.event.id])
+
+    def test_join_and_leave_update_counter(self):
+        response = self.client.post(self.join_url)
+
+        self.assertEqual(response.status_code, 201)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 1)
+
+        response = self.client.delete(self.leave_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 0)
+        self.assertFalse(EventParticipant.objects.exists())
+
+    def test_join_twice(self):
+        self.event.max_participants = None
+        self.event.save()
+        self.client.post(self.join_url)
+
+        response = self.client.post(self.join_url)
+
+        self.assertEqual(response.status_code, 400)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 1)
+
+    def test_full_event_puts_user_on_waitlist(self):
+        self.add_participant(self.event, self.organizer)
+
+        response = self.client.post(self.join_url)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'waitlisted')
+        self.assertEqual(response.data['waitlist_position'], 1)
+        self.assertEqual(response.data['waitlist_place'], 1)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 1)
+        self.assertEqual(self.event.waitlist_count, 1)
+
+    def test_waitlist_place_differs_from_ticket(self):
+        self.add_participant(self.event, self.organizer)
+        self.add_participant(self.event, User.objects.create_user(username='left')).delete()
+
+        response = self.client.post(self.join_url)
+
+        # Номер в очереди не переиспользуется, а место считается по оставшимся в очереди
+        self.assertEqual(response.data['waitlist_position'], 2)
+        self.assertEqual(response.data['waitlist_place'], 1)
+        self.assertEqual(EventParticipant.objects.get(user=self.user).waitlist_position, 2)
+
+    def test_leave_promotes_waitlist_head(self):
+        self.add_participant(self.event, self.organizer)
+        waiting = [User.objects.create_user(username=f'waiting{i}') for i in range(3)]
+        for user in waiting:
+            self.client.force_authenticate(user)
+            self.client.post(self.join_url)
+
+        self.client.force_authenticate(self.organizer)
+        self.client.delete(self.leave_url)
+
+        self.assertEqual(
+            EventParticipant.objects.get(event=self.event, user=waiting[0]).status, 'confirmed'
+        )
+        self.assertEqual(
+            list(EventParticipant.objects.waitlisted().order_by('waitlist_position').values_list('user', flat=True)),
+            [waiting[1].id, waiting[2].id]
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 1)
+        self.assertEqual(self.event.waitlist_count, 2)
+
+        # Уход из очереди не меняет число участников, и следующий в очереди сдвигается
+        self.client.force_authenticate(waiting[1])
+        self.client.delete(self.leave_url)
+        self.client.force_authenticate(waiting[0])
+        self.client.delete(self.leave_url)
+
+        self.assertEqual(
+            EventParticipant.objects.get(event=self.event, user=waiting[2]).status, 'confirmed'
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 1)
+        self.assertEqual(self.event.waitlist_count, 0)
+
+    def test_waitlisted_user_is_not_participant(self):
+        self.add_participant(self.event, self.organizer)
+        self.client.post(self.join_url)
+
+        response = self.client.get(reverse('api:events:event-detail', args=[self.event.id]))
+
+        self.assertFalse(response.data['user_is_participant'])
+        self.assertEqual(response.data['user_participation_status'], 'waitlisted')
+        self.assertEqual(response.data['waitlist_count'], 1)
+        self.assertEqual(len(response.data['participants']), 1)
+
+    def test_leave_without_participation(self):
+        response = self.client.delete(self.leave_url)
+
+        self.assertEqual(response.status_code, 400)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 0)
+
+    def test_rebuild_participants_count(self):
+        self.add_participant(self.event, self.organizer)
+        self.add_participant(self.event, self.user)
+        # Счетчик разошелся со строками, а новое место не досталось очереди
+        # (правки через update() и SQL не вызывают сигналы)
+        Event.objects.filter(pk=self.event.pk).update(participants_count=5, max_participants=2)
+
+        out = StringIO()
+        call_command('rebuild_participants_count', stdout=out)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 2)
+        self.assertEqual(self.event.waitlist_count, 0)
+        self.assertEqual(EventParticipant.objects.get(user=self.user).status, 'confirmed')
+        self.assertIn('1 event(s), promoted 1', out.getvalue())
+
+    def test_deleted_user_frees_seat_for_waitlist(self):
+        seated = User.objects.create_user(username='seated')
+        self.add_participant(self.event, seated)
+        waiting = self.add_participant(self.event, self.user)
+        self.assertEqual(waiting.status, 'waitlisted')
+
+        # Каскадное удаление участия вместе с пользователем (как из админки)
+        seated.delete()
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 1)
+        self.assertEqual(self.event.waitlist_count, 0)
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, 'confirmed')
+        self.assertIsNone(waiting.waitlist_position)
+
+    def test_participants_added_outside_views_respect_capacity(self):
+        self.add_participant(self.event, self.organizer)
+        extra = self.add_participant(self.event, self.user, status='confirmed')
+
+        self.assertEqual(extra.status, 'waitlisted')
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.participants_count, self.event.waitlist_count), (1, 1))
+
+        # Отмена из очереди освобождает место в очереди, но не занимает места на событии
+        extra.status = 'cancelled'
+        extra.save()
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.participants_count, self.event.waitlist_count), (1, 0))
+
+    def test_cancelled_participant_gives_up_seat(self):
+        seated = self.add_participant(self.event, self.organizer)
+        waiting = self.add_participant(self.event, self.user)
+
+        seated.status = 'cancelled'
+        seated.save()
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.participants_count, self.event.waitlist_count), (1, 0))
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, 'confirmed')
+
+        # Возврат из отмены на заполненное событие ставит в очередь
+        seated.status = 'confirmed'
+        seated.save()
+        self.assertEqual(seated.status, 'waitlisted')
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.participants_count, self.event.waitlist_count), (1, 1))
+
+        # Удаление отмененного участия не освобождает чужих мест
+        seated.status = 'cancelled'
+        seated.save()
+        seated.delete()
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.participants_count, self.event.waitlist_count), (1, 0))
+        self.assertEqual(Event.objects.filter(pk=self.event.pk).rebuild_participants_count(), 0)
+
+    def test_deleting_event_skips_counters(self):
+        self.add_participant(self.event, self.organizer)
+        self.add_participant(self.event, self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.event.delete()
+        self.assertFalse(EventParticipant.objects.exists())
+        # Удаляемому событию не пересчитываются счетчики и не продвигается очередь
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+
+class ConcurrentJoinTests(TransactionTestCase):
+    """Наплыв регистраций не превышает лимит участников, остальные попадают в очередь"""
+
+    joins = 500
+    capacity = 50
+
+    def setUp(self):
+        organizer = User.objects.create_user(username='organizer')
+        self.event = Event.objects.create(
+            title='Популярное событие', organizer=organizer,
+            start_datetime=timezone.now() + timedelta(days=1), max_participants=self.capacity
+        )
+        # bulk_create без сигналов - профили для этого теста не нужны
+        self.users = User.objects.bulk_create(User(username=f'rush{i}') for i in range(self.joins))
+        self.factory = APIRequestFactory()
+
+    def join(self, user):
+        request = self.factory.post(f'/api/events/{self.event.id}/join/')
+        force_authenticate(request, user=user)
+        delay = 0.001
+        try:
+            while True:
+                try:
+                    return join_event(request, event_id=self.event.id).status_code
+                except OperationalError:
+                    # Общая in-memory SQLite в тестах не ждет блокировку, а сразу
+                    # отвечает "database table is locked" - повторяем как клиент
+                    time.sleep(random.uniform(0, delay))
+                    delay = min(delay * 2, 0.05)
+        finally:
+            connection.close()
+
+    def test_no_oversubscription(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = Counter(executor.map(self.join, self.users))
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, self.capacity)
+        self.assertEqual(EventParticipant.objects.seated().filter(event=self.event).count(), self.capacity)
+        # Повтор после сбоя уже на ответе может получить "уже участник", но не лишнее место
+        self.assertLessEqual(statuses[201], self.capacity)
+        self.assertEqual(statuses[201] + statuses[202] + statuses[400], self.joins)
+
+        # Все остальные в очереди, у каждого свой номер
+        positions = EventParticipant.objects.waitlisted().values_list('waitlist_position', flat=True)
+        self.assertEqual(self.event.waitlist_count, self.joins - self.capacity)
+        self.assertEqual(len(set(positions)), self.joins - self.capacity)
+
+
+class CalendarTests(EventsTestCase):
+    """Календарь по месяцам: кэш, инвалидация и условные запросы"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('api:events:calendar-events')
+        self.params = {'year': 2030, 'month': 3}
+
+    def at(self, month, day, hour=10):
+        return timezone.make_aware(datetime(2030, month, day, hour))
+
+    def test_month_is_grouped_by_day_and_cached(self):
+        self.create_event(title='Первое', start_datetime=self.at(3, 1, 0))
+        self.create_event(title='Второе', start_datetime=self.at(3, 31, 23))
+        self.create_event(title='Апрель', start_datetime=self.at(4, 1, 0))
+        self.create_event(title='Скрытое', start_datetime=self.at(3, 5), is_public=False)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, self.params)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url, self.params)
+
+        self.assertEqual(
+            {day: [event['title'] for event in events] for day, events in response.data['events'].items()},
+            {1: ['Первое'], 31: ['Второе']}
+        )
+        self.assertEqual(response.data['events'][31][0]['time'], '23:00')
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_month_is_dropped_again_after_commit(self):
+        event = self.create_event(start_datetime=self.at(3, 10))
+        for change in (event.save, event.delete):
+            with self.subTest(change=change.__name__):
+                with self.captureOnCommitCallbacks() as callbacks:
+                    change()
+                # Месяц, построенный до коммита, снова попал в кэш
+                self.client.get(self.url, self.params)
+                for callback in callbacks:
+                    callback()
+                with self.assertNumQueries(1):
+                    self.client.get(self.url, self.params)
+
+    def test_unchanged_month_returns_not_modified(self):
+        self.create_event(start_datetime=self.at(3, 10))
+        etag = self.client.get(self.url, self.params)['ETag']
+
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_event_changes_invalidate_months(self):
+        event = self.create_event(title='Переносимое', start_datetime=self.at(3, 10))
+        march_etag = self.client.get(self.url, self.params)['ETag']
+        self.client.get(self.url, {'year': 2030, 'month': 4})
+
+        event = Event.objects.get(pk=event.pk)
+        event.start_datetime = self.at(4, 2)
+        event.save()
+
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=march_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['events'], {})
+        response = self.client.get(self.url, {'year': 2030, 'month': 4})
+        self.assertEqual(response.data['events'][2][0]['title'], 'Переносимое')
+
+        event.delete()
+
+        response = self.client.get(self.url, {'year': 2030, 'month': 4})
+        self.assertEqual(response.data['events'], {})
+
+    def test_invalid_month(self):
+        response = self.client.get(self.url, {'year': 2030, 'month': 13})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class RecurrenceRuleTests(SimpleTestCase):
+    """Развертывание повторений в окне без перебора предыдущих"""
+
+    def at(self, year, month, day, hour=9):
+        return timezone.make_aware(datetime(year, month, day, hour))
+
+    def test_weekly_window_far_from_start(self):
+        rule = RecurrenceRule(WEEKLY, interval=2)
+        start = self.at(2000, 1, 3)
+
+        with mock.patch.object(RecurrenceRule, 'nth', wraps=rule.nth) as nth:
+            found = list(rule.between(start, timedelta(hours=2), self.at(2030, 3, 1), self.at(2030, 4, 1)))
+
+        self.assertEqual([occurrence.date() for occurrence, _ in found], [
+            date(2030, 3, 4), date(2030, 3, 18)
+        ])
+        # Номер первого повторения вычисляется, а не перебирается с 2000 года
+        self.assertLess(nth.call_count, 10)
+
+    def test_occurrence_overlapping_window_start(self):
+        rule = RecurrenceRule(DAILY)
+
+        found = list(rule.between(self.at(2030, 1, 1, 22), timedelta(hours=4), self.at(2030, 1, 5, 0), self.at(2030, 1, 6, 0)))
+
+        self.assertEqual([occurrence for occurrence, _ in found], [self.at(2030, 1, 4, 22), self.at(2030, 1, 5, 22)])
+
+    def test_monthly_clamps_to_month_end(self):
+        rule = RecurrenceRule(MONTHLY, count=4)
+        start = self.at(2030, 1, 31)
+
+        found = [occurrence for occurrence, _ in rule.between(start, timedelta(0), start, self.at(2031, 1, 1))]
+
+        self.assertEqual([occurrence.date() for occurrence in found], [
+            date(2030, 1, 31), date(2030, 2, 28), date(2030, 3, 31), date(2030, 4, 30)
+        ])
+
+    def test_series_end(self):
+        start = self.at(2030, 1, 1)
+
+        self.assertEqual(RecurrenceRule(DAILY, count=10).last_start(start), self.at(2030, 1, 10))
+        self.assertEqual(RecurrenceRule(WEEKLY, until=self.at(2030, 1, 20)).last_start(start), self.at(2030, 1, 15))
+        self.assertEqual(
+            RecurrenceRule(DAILY, count=100, until=self.at(2030, 1, 3)).last_start(start), self.at(2030, 1, 3)
+        )
+        self.assertIsNone(RecurrenceRule(DAILY).last_start(start))
+
+    def test_next_after(self):
+        rule = RecurrenceRule(WEEKLY, count=3)
+        start = self.at(2030, 1, 1)
+
+        self.assertEqual(rule.next_after(start, self.at(2030, 1, 2)), self.at(2030, 1, 8))
+        self.assertIsNone(rule.next_after(start, self.at(2030, 1, 16)))
+
+
+class RecurringEventTests(EventsTestCase):
+    """Повторяющиеся и многодневные события в календаре и списке"""
+
+    def setUp(self):
+        super().setUp()
+        self.calendar_url = reverse('api:events:calendar-events')
+
+    def at(self, month, day, hour=10, year=2030):
+        return timezone.make_aware(datetime(year, month, day, hour))
+
+    def calendar_days(self, month, year=2030):
+        response = self.client.get(self.calendar_url, {'year': year, 'month': month})
+        return {day: [event['title'] for event in events] for day, events in response.data['events'].items()}
+
+    def test_series_end_is_stored(self):
+        lecture = self.create_event(
+            start_datetime=self.at(1, 7), end_datetime=self.at(1, 7, 12),
+            recurrence_frequency=WEEKLY, recurrence_count=3
+        )
+        endless = self.create_event(start_datetime=self.at(1, 7), recurrence_frequency=DAILY)
+        single = self.create_event(start_datetime=self.at(1, 7), end_datetime=self.at(1, 9))
+
+        self.assertEqual(lecture.series_end, self.at(1, 21, 12))
+        self.assertIsNone(endless.series_end)
+        self.assertEqual(single.series_end, self.at(1, 9))
+
+    def test_calendar_expands_recurring_and_multi_day_events(self):
+        self.create_event(
+            title='Лекция', start_datetime=self.at(1, 7), end_datetime=self.at(1, 7, 12),
+            recurrence_frequency=WEEKLY, recurrence_until=self.at(3, 11)
+        )
+        self.create_event(title='Сессия', start_datetime=self.at(2, 27), end_datetime=self.at(3, 2, 18))
+
+        with self.assertNumQueries(1):
+            march = self.calendar_days(3)
+
+        self.assertEqual(march, {1: ['Сессия'], 2: ['Сессия'], 4: ['Лекция'], 11: ['Лекция']})
+        self.assertEqual(self.calendar_days(2), {
+            4: ['Лекция'], 11: ['Лекция'], 18: ['Лекция'], 25: ['Лекция'], 27: ['Сессия'], 28: ['Сессия']
+        })
+        self.assertEqual(self.calendar_days(4), {})
+
+    def test_changing_series_invalidates_all_months(self):
+        lecture = self.create_event(
+            title='Лекция', start_datetime=self.at(1, 7), recurrence_frequency=WEEKLY
+        )
+        june = self.calendar_days(6)
+        self.assertEqual(june, {3: ['Лекция'], 10: ['Лекция'], 17: ['Лекция'], 24: ['Лекция']})
+
+        lecture = Event.objects.get(pk=lecture.pk)
+        lecture.recurrence_interval = 2
+        lecture.save()
+
+        self.assertEqual(self.calendar_days(6), {10: ['Лекция'], 24: ['Лекция']})
+
+    def test_upcoming_includes_running_series(self):
+        now = timezone.now()
+        self.create_event(
+            title='Идет', start_datetime=now - timedelta(days=30),
+            recurrence_frequency=WEEKLY, recurrence_count=10
+        )
+        self.create_event(
+            title='Закончилась', start_datetime=now - timedelta(days=30),
+            recurrence_frequency=DAILY, recurrence_count=3
+        )
+        self.create_event(title='Прошло', start_datetime=now - timedelta(days=1))
+        self.create_event(title='Будет', start_datetime=now + timedelta(days=1))
+
+        response = self.client.get(reverse('api:events:event-list-create'), {'date': 'upcoming'})
+
+        rows = {row['title']: row for row in response.data['results']}
+        self.assertEqual(set(rows), {'Идет', 'Будет'})
+        self.assertIsNotNone(rows['Идет']['next_occurrence'])
+
+    def test_day_and_month_filters_expand_series(self):
+        now = timezone.now()
+        daily = self.create_event(
+            title='Каждый день', start_datetime=now - timedelta(days=30), recurrence_frequency=DAILY, recurrence_count=60
+        )
+        # Повторения в другие дни: -29, -22, ..., -1, +6 дней от сегодняшнего
+        self.create_event(
+            title='Не сегодня', start_datetime=now - timedelta(days=29), recurrence_frequency=WEEKLY, recurrence_count=10
+        )
+        self.create_event(
+            title='Лекция', start_datetime=self.at(1, 7), recurrence_frequency=WEEKLY, recurrence_until=self.at(3, 11)
+        )
+        url = reverse('api:events:event-list-create')
+
+        rows = {row['title']: row for row in self.client.get(url, {'date': 'today'}).data['results']}
+        self.assertEqual(set(rows), {'Каждый день'})
+        self.assertTrue(rows['Каждый день']['is_today'])
+        self.assertFalse(rows['Каждый день']['is_past'])
+        self.assertFalse(daily.is_past)
+
+        for month, titles in ((3, ['Лекция']), (4, [])):
+            with self.subTest(month=month):
+                response = self.client.get(url, {'year': 2030, 'month': month})
+                self.assertEqual([row['title'] for row in response.data['results']], titles)
+        self.assertEqual(self.client.get(url, {'year': 2030, 'month': 13}).status_code, 400)
+
+    def test_recurrence_validation(self):
+        response = self.client.post(reverse('api:events:event-list-create'), {
+            'title': 'Без частоты', 'start_datetime': self.at(1, 7).isoformat(), 'recurrence_count': 5
+        })
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recurrence_frequency', response.data)
+
+
+class EventQueryPlanTests(QueryPlanAssertionsMixin, EventsTestCase):
+    """Запросы эндпоинтов событий используют индексы"""
+
+    def setUp(self):
+        super().setUp()
+        self.event = self.create_event(category='academic', max_participants=1)
+        self.add_participant(self.event, self.organizer)
+        EventReview.objects.create(event=self.event, author=self.organizer, rating=5)
+
+    def test_filtered_list(self):
+        url = reverse('api:events:event-list-create')
+        params_list = (
+            {'category': 'academic'}, {'date': 'upcoming'}, {'date': 'today'},
+            {'date': 'past', 'category': 'exam'}, {'my_events': 'true'},
+        )
+        for params in params_list:
+            # Упорядоченный обход индекса по началу - это сам список событий с LIMIT
+            with self.subTest(params=params), self.assertNoFullTableScans(allow=['event_public_start_idx']):
+                self.assertEqual(self.client.get(url, params).status_code, 200)
+
+    def test_unfiltered_list(self):
+        # Без фильтров пагинатор считает все публичные события: COUNT(*) обходит
+        # самый компактный частичный индекс по is_public целиком, это и есть подсчет
+        allow = ['event_public_start_idx', 'event_public_series_end_idx']
+        with self.assertNoFullTableScans(allow=allow):
+            self.assertEqual(self.client.get(reverse('api:events:event-list-create')).status_code, 200)
+
+    def test_today_and_my_events(self):
+        now = timezone.localtime()
+        today = self.create_event(start_datetime=now.replace(hour=0, minute=0, second=0, microsecond=0))
+        self.create_event(start_datetime=today.start_datetime - timedelta(microseconds=1))
+        organized = self.create_event(organizer=self.user, start_datetime=now + timedelta(days=30))
+
+        url = reverse('api:events:event-list-create')
+        response = self.client.get(url, {'date': 'today'})
+        self.assertEqual([item['id'] for item in response.data['results']], [str(today.id)])
+
+        response = self.client.get(url, {'my_events': 'true'})
+        self.assertEqual([item['id'] for item in response.data['results']], [str(organized.id)])
+        self.add_participant(self.event, self.user)
+        response = self.client.get(url, {'my_events': 'true'})
+        self.assertEqual({item['id'] for item in response.data['results']}, {str(self.event.id), str(organized.id)})
+
+    def test_detail_and_sub_resources(self):
+        urls = [
+            reverse('api:events:event-detail', args=[self.event.id]),
+            reverse('api:events:event-participants', args=[self.event.id]),
+            reverse('api:events:event-reviews', args=[self.event.id]),
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertNoFullTableScans():
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_calendar(self):
+        with self.assertNoFullTableScans():
+            response = self.client.get(reverse('api:events:calendar-events'), {'year': 2030, 'month': 3})
+        self.assertEqual(response.status_code, 200)
+
+    def test_join_and_leave(self):
+        with self.assertNoFullTableScans():
+            joined = self.client.post(reverse('api:events:join-event', args=[self.event.id]))
+            left = self.client.delete(reverse('api:events:leave-event', args=[self.event.id]))
+        # Единственное место занято организатором: пользователь попадает в очередь
+        self.assertEqual(joined.status_code, 202)
+        self.assertEqual(left.status_code, 200)
@@ -11,6 +11,7 @@ urlpatterns = [
     # Участие в событиях
     path('<uuid:event_id>/join/', views.join_event, name='join-event'),
     path('<uuid:event_id>/leave/', views.leave_event, name='leave-event'),
+    path('<uuid:event_id>/participants/', views.EventParticipantListView.as_view(), name='event-participants'),
     
     # Отзывы на события
     path('<uuid:event_id>/reviews/', views.EventReviewListCreateView.as_view(), name='event-reviews'),
@@ -1,15 +1,29 @@
-from rest_framework import generics, status, permissions
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+from rest_framework import exceptions, generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db import models
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.db import IntegrityError, models, transaction
+from api.pagination import KeysetPagination
+from api.replicas import replica_reads
+from .cache import get_calendar_month, set_calendar_month
 from .models import Event, EventParticipant, EventReview
+from .recurrence import RecurrenceRule, day_range, month_range, occurrences
 from .serializers import (
     EventListSerializer, EventDetailSerializer, EventReviewSerializer,
     EventCreateFromPostSerializer, EventParticipantSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 
 class EventListCreateView(generics.ListCreateAPIView):
     """Список событий и создание нового события"""
@@ -31,10 +45,11 @@ class EventListCreateView(generics.ListCreateAPIView):
         # Фильтрация по дате
         date_filter = self.request.query_params.get('date')
         if date_filter == 'today':
-            today = timezone.now().date()
-            queryset = queryset.filter(start_datetime__date=today)
+            # Включая повторения серий и многодневные события, идущие сегодня
+            queryset = queryset.occurring(*day_range(timezone.localdate()))
         elif date_filter == 'upcoming':
-            queryset = queryset.filter(start_datetime__gte=timezone.now())
+            # Включая повторяющиеся серии, у которых впереди есть повторения
+            queryset = queryset.upcoming()
         elif date_filter == 'past':
             queryset = queryset.filter(start_datetime__lt=timezone.now())
 
@@ -42,28 +57,41 @@ class EventListCreateView(generics.ListCreateAPIView):
         year = self.request.query_params.get('year')
         month = self.request.query_params.get('month')
         if year and month:
-            queryset = queryset.filter(
-                start_datetime__year=int(year),
-                start_datetime__month=int(month)
-            )
+            try:
+                window = month_range(int(year), int(month))
+            except (ValueError, TypeError, OverflowError):
+                raise exceptions.ValidationError({'error': 'Неверный формат года или месяца'})
+            queryset = queryset.occurring(*window)
 
         # Мои события (где пользователь организатор или участник)
         my_events = self.request.query_params.get('my_events')
         if my_events == 'true':
             user = self.request.user
+            # Подзапрос по участиям вместо JOIN с DISTINCT: оба условия ищутся по индексам
             queryset = queryset.filter(
-                models.Q(organizer=user) | models.Q(participants=user)
-            ).distinct()
+                models.Q(organizer=user) |
+                models.Q(pk__in=EventParticipant.objects.filter(user=user).values('event'))
+            )
+
+        return queryset.with_list_data(self.request.user).order_by('start_datetime')
 
-        return queryset.order_by('start_datetime')
+
+class EventParticipantPagination(KeysetPagination):
+    """Участники в порядке регистрации"""
+    ordering = ('registered_at', 'id')
 
 
 class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Детальная информация о событии"""
-    queryset = Event.objects.all()
     serializer_class = EventDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        # Сводные счетчики и только первая страница участников и отзывов
+        return Event.objects.with_detail_data(
+            self.request.user, preview=settings.EVENT_DETAIL_PREVIEW_SIZE
+        )
+
     def get_permissions(self):
         """Только организатор может изменять/удалять событие"""
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
@@ -71,14 +99,26 @@ class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.IsAuthenticated()]
 
 
+class EventParticipantListView(generics.ListAPIView):
+    """Участники события постранично"""
+    serializer_class = EventParticipantSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = EventParticipantPagination
+
+    def get_queryset(self):
+        event = get_object_or_404(Event, id=self.kwargs['event_id'])
+        return EventParticipant.objects.seated().filter(event=event).select_related('user__profile')
+
+
 class EventReviewListCreateView(generics.ListCreateAPIView):
     """Отзывы на событие"""
     serializer_class = EventReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         event_id = self.kwargs['event_id']
-        return EventReview.objects.filter(event_id=event_id)
+        return EventReview.objects.filter(event_id=event_id).select_related('author__profile')
 
     def perform_create(self, serializer):
         event_id = self.kwargs['event_id']
@@ -89,7 +129,7 @@ class EventReviewListCreateView(generics.ListCreateAPIView):
 
         if existing_review:
             # Обновляем существующий отзыв
-            print(f"🔄 Обновляем существующий отзыв пользователя {self.request.user.username}")
+            logger.info("Обновляем существующий отзыв пользователя %s", self.request.user.username)
             existing_review.rating = serializer.validated_data['rating']
             existing_review.comment = serializer.validated_data.get('comment', '')
             existing_review.save()
@@ -97,37 +137,38 @@ class EventReviewListCreateView(generics.ListCreateAPIView):
             serializer.instance = existing_review
         else:
             # Создаем новый отзыв
-            print(f"✅ Создаем новый отзыв от пользователя {self.request.user.username}")
+            logger.info("Создаем новый отзыв от пользователя %s", self.request.user.username)
             serializer.save(event=event, author=self.request.user)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def join_event(request, event_id):
-    """Присоединиться к событию"""
+    """Присоединиться к событию или встать в лист ожидания, если мест нет"""
     event = get_object_or_404(Event, id=event_id)
     user = request.user
 
-    # Проверяем, что пользователь еще не участник
-    if event.participants.filter(id=user.id).exists():
+    try:
+        with transaction.atomic():
+            # Повторное участие отсекает уникальный индекс (event, user).
+            # Место занимает сигнал post_save условным UPDATE, поэтому лимит не превышается
+            # при гонке, а если мест нет - ставит в очередь вместо отказа
+            participation = EventParticipant.objects.create(
+                event=event,
+                user=user,
+                status='registered' if event.requires_registration else 'confirmed'
+            )
+    except IntegrityError:
         return Response(
             {'error': 'Вы уже являетесь участником этого события'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Проверяем лимит участников
-    if event.max_participants and event.participants_count >= event.max_participants:
-        return Response(
-            {'error': 'Достигнуто максимальное количество участников'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-
-    # Создаем участие
-    participation = EventParticipant.objects.create(
-        event=event,
-        user=user,
-        status='registered' if event.requires_registration else 'confirmed'
-    )
+    if participation.status == EventParticipant.WAITLISTED:
+        data = EventParticipantSerializer(participation).data
+        # waitlist_position - номер в очереди (как везде в API), waitlist_place - сколько человек впереди, включая себя
+        data['waitlist_place'] = participation.waitlist_place
+        return Response(data, status=status.HTTP_202_ACCEPTED)
 
     serializer = EventParticipantSerializer(participation)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -136,19 +177,23 @@ def join_event(request, event_id):
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def leave_event(request, event_id):
-    """Покинуть событие"""
+    """Покинуть событие или лист ожидания"""
     event = get_object_or_404(Event, id=event_id)
     user = request.user
 
-    try:
-        participation = EventParticipant.objects.get(event=event, user=user)
+    with transaction.atomic():
+        # Блокировка строки: повторный параллельный выход не освободит место дважды
+        participation = EventParticipant.objects.select_for_update().filter(event=event, user=user).first()
+        if participation is None:
+            return Response(
+                {'error': 'Вы не являетесь участником этого события'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Место переходит первому в очереди (или освобождается) в сигнале post_delete
         participation.delete()
-        return Response({'message': 'Вы покинули событие'}, status=status.HTTP_200_OK)
-    except EventParticipant.DoesNotExist:
-        return Response(
-            {'error': 'Вы не являетесь участником этого события'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+
+    return Response({'message': 'Вы покинули событие'}, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -163,6 +208,57 @@ def create_event_from_post(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def build_calendar_month(year, month):
+    """Собирает события месяца по дням вместе с ETag и временем сборки"""
+    start, end = month_range(year, month)
+
+    # Кандидаты ищутся по диапазону с индексами, values() не создает экземпляры моделей.
+    # Повторяющиеся серии хранятся одной строкой и разворачиваются только в пределах месяца
+    events = Event.objects.filter(is_public=True).overlapping(start, end).values(
+        'id', 'title', 'start_datetime', 'end_datetime', 'category', 'location',
+        'recurrence_frequency', 'recurrence_interval', 'recurrence_count', 'recurrence_until'
+    )
+
+    # Группируем по дням; многодневное событие попадает в каждый свой день месяца
+    calendar_data = {}
+    for event in events:
+        rule = RecurrenceRule.from_fields(
+            event['recurrence_frequency'], event['recurrence_interval'],
+            event['recurrence_count'], event['recurrence_until']
+        )
+        for occurrence_start, occurrence_end in occurrences(
+            event['start_datetime'], event['end_datetime'], rule, start, end
+        ):
+            local_start = timezone.localtime(occurrence_start)
+            item = {
+                'id': str(event['id']),
+                'title': event['title'],
+                'time': local_start.strftime('%H:%M'),
+                'start': local_start.isoformat(),
+                'end': timezone.localtime(occurrence_end).isoformat(),
+                'category': event['category'],
+                'location': event['location']
+            }
+
+            # Конец не включается: событие до полуночи не занимает следующий день
+            first_moment = max(occurrence_start, start)
+            last_moment = max(min(occurrence_end, end) - timedelta(microseconds=1), first_moment)
+            day = timezone.localtime(first_moment).date()
+            while day <= timezone.localtime(last_moment).date():
+                calendar_data.setdefault(day.day, []).append(item)
+                day += timedelta(days=1)
+
+    for day_events in calendar_data.values():
+        day_events.sort(key=lambda item: item['start'])
+
+    digest = hashlib.md5(json.dumps(calendar_data, sort_keys=True).encode('utf-8')).hexdigest()
+    return {
+        'events': calendar_data,
+        'etag': quote_etag(digest),
+        'last_modified': int(time.time()),
+    }
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def calendar_events(request):
@@ -173,39 +269,37 @@ def calendar_events(request):
     try:
         year = int(year)
         month = int(month)
-    except (ValueError, TypeError):
+        month_range(year, month)
+    except (ValueError, TypeError, OverflowError):
         return Response(
             {'error': 'Неверный формат года или месяца'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Получаем события за месяц
-    events = Event.objects.filter(
-        start_datetime__year=year,
-        start_datetime__month=month,
-        is_public=True
-    ).order_by('start_datetime')
+    # Месяц кэшируется до изменения или удаления любого его события
+    calendar = get_calendar_month(year, month)
+    if calendar is None:
+        # Месяц собирается по основной БД: отстающая реплика сохранила бы
+        # в новом поколении кэша данные до изменения
+        with replica_reads(False):
+            calendar = build_calendar_month(year, month)
+        set_calendar_month(year, month, calendar)
 
-    # Группируем по дням
-    calendar_data = {}
-    for event in events:
-        day = event.start_datetime.day
-        if day not in calendar_data:
-            calendar_data[day] = []
-
-        calendar_data[day].append({
-            'id': str(event.id),
-            'title': event.title,
-            'time': event.start_datetime.strftime('%H:%M'),
-            'category': event.category,
-            'location': event.location
-        })
-
-    return Response({
+    response = Response({
         'year': year,
         'month': month,
-        'events': calendar_data
+        'events': calendar['events']
     })
+    response['ETag'] = calendar['etag']
+    response['Last-Modified'] = http_date(calendar['last_modified'])
+
+    # Если у клиента актуальная версия месяца, отвечаем 304 без тела
+    return get_conditional_response(
+        request,
+        etag=calendar['etag'],
+        last_modified=calendar['last_modified'],
+        response=response
+    )
 
 
 class IsEventOrganizerOrReadOnly(permissions.BasePermission):
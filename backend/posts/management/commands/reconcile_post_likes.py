@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Recompute Post.likes from Like rows (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconciling post likes...')
+
+        updated = Post.objects.reconcile_likes()
+
+        self.stdout.write(self.style.SUCCESS(f'Fixed likes counter on {updated} post(s)'))
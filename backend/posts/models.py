@@ -1,9 +1,66 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 import uuid
 
 
+class PostQuerySet(models.QuerySet):
+    def with_feed_data(self, user=None, comments_preview=None):
+        """
+        Loads everything the feed serializer needs in a fixed number of queries.
+
+        With comments_preview only the latest N comments of each post are
+        loaded into `latest_comments` instead of the whole thread.
+        """
+        comments = Comment.objects.select_related('author__profile').order_by('-created_at', '-id')
+        if comments_preview is None:
+            comments_prefetch = models.Prefetch('comments', queryset=comments)
+        else:
+            comments_prefetch = models.Prefetch(
+                'comments', queryset=comments[:comments_preview], to_attr='latest_comments'
+            )
+
+        # A correlated subquery instead of Count('comments'): without GROUP BY the
+        # feed is read in (created_at, id) index order and stops at the page size
+        comments_total = Coalesce(
+            models.Subquery(
+                Comment.objects.filter(post=models.OuterRef('pk'))
+                .order_by()
+                .values('post')
+                .annotate(total=models.Count('id'))
+                .values('total')
+            ),
+            0,
+        )
+        queryset = self.select_related('author__profile').annotate(
+            comments_total=comments_total,
+        ).prefetch_related(comments_prefetch)
+
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(
+                liked_by_user=models.Exists(
+                    Like.objects.filter(post=models.OuterRef('pk'), user=user)
+                )
+            )
+        return queryset
+
+    def reconcile_likes(self):
+        """Recomputes the denormalized likes counter from Like rows in bulk"""
+        actual_likes = Coalesce(
+            models.Subquery(
+                Like.objects.filter(post=models.OuterRef('pk'))
+                .order_by()
+                .values('post')
+                .annotate(total=models.Count('id'))
+                .values('total')
+            ),
+            0
+        )
+        # Обновляем только разошедшиеся счетчики
+        return self.exclude(likes=actual_likes).update(likes=actual_likes)
+
+
 class Post(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
@@ -14,14 +71,22 @@ class Post(models.Model):
     likes = models.PositiveIntegerField(default=0)
     views = models.PositiveIntegerField(default=0)
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Ключ для пагинации ленты по курсору
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.username} - {self.content[:50]}..."
 
     @property
     def comments_count(self):
+        if hasattr(self, 'comments_total'):
+            return self.comments_total
         return self.comments.count()
 
 
@@ -35,6 +100,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.username} on {self.post.id}"
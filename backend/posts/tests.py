@@ -1,3 +1,100 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from .models import Post, Like
+from .view_counter import ViewCounterBuffer
 
-# Create your tests here.
+
+class ReconcileLikesTests(TestCase):
+    """Пересчет денормализованного счетчика лайков"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.fans = [User.objects.create_user(username=f'fan{i}') for i in range(3)]
+
+    def test_reconcile_fixes_only_drifted_posts(self):
+        drifted = Post.objects.create(author=self.author, content='Разошелся', likes=10)
+        correct = Post.objects.create(author=self.author, content='Верный', likes=2)
+        orphan = Post.objects.create(author=self.author, content='Без лайков', likes=4)
+        for fan in self.fans[:2]:
+            Like.objects.create(post=drifted, user=fan)
+            Like.objects.create(post=correct, user=fan)
+
+        with self.assertNumQueries(1):
+            updated = Post.objects.reconcile_likes()
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(
+            dict(Post.objects.values_list('id', 'likes')),
+            {drifted.id: 2, correct.id: 2, orphan.id: 0}
+        )
+
+    def test_management_command(self):
+        post = Post.objects.create(author=self.author, content='Пост', likes=7)
+        Like.objects.create(post=post, user=self.fans[0])
+
+        out = StringIO()
+        call_command('reconcile_post_likes', stdout=out)
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes, 1)
+        self.assertIn('1 post(s)', out.getvalue())
+
+
+class ViewCounterBufferTests(TestCase):
+    """Буферизованный счетчик просмотров"""
+
+    def setUp(self):
+        author = User.objects.create_user(username='author')
+        self.posts = [Post.objects.create(author=author, content=f'Пост {i}', views=10) for i in range(3)]
+        self.buffer = ViewCounterBuffer(flush_interval=3600)
+        self.addCleanup(self.buffer.shutdown)
+
+    def test_views_are_buffered_until_flush(self):
+        first, second, third = self.posts
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.buffer.increment(first.pk)
+            self.buffer.increment(second.pk)
+            self.buffer.increment(third.pk)
+
+        self.assertEqual(self.buffer.pending(first.pk), 3)
+
+        # Посты с одинаковым приростом обновляются одним запросом
+        with self.assertNumQueries(4):
+            flushed = self.buffer.flush()
+
+        self.assertEqual(flushed, 5)
+        self.assertEqual(self.buffer.pending(first.pk), 0)
+        self.assertEqual(
+            dict(Post.objects.values_list('id', 'views')),
+            {first.id: 13, second.id: 11, third.id: 11}
+        )
+
+    def test_shutdown_flushes_pending_views(self):
+        self.buffer.increment(self.posts[0].pk)
+
+        self.buffer.shutdown()
+
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].views, 11)
+
+    def test_failed_flush_keeps_views(self):
+        self.buffer.increment(self.posts[0].pk)
+
+        with mock.patch('posts.models.Post.objects.filter', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush()
+
+        self.assertEqual(self.buffer.pending(self.posts[0].pk), 1)
+
+    def test_zero_interval_writes_immediately(self):
+        buffer = ViewCounterBuffer(flush_interval=0)
+
+        buffer.increment(self.posts[0].pk)
+
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].views, 11)
+        self.assertEqual(buffer.pending(self.posts[0].pk), 0)
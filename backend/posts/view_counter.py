@@ -0,0 +1,118 @@
+"""
+Буферизованный счетчик просмотров постов.
+
+Просмотры копятся в памяти процесса и периодически сбрасываются в
+Post.views пакетными UPDATE вместо отдельной записи на каждый просмотр.
+"""
+
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# Ограничение на число параметров в одном UPDATE ... WHERE id IN (...)
+FLUSH_BATCH_SIZE = 500
+
+
+class ViewCounterBuffer:
+    """Накопитель просмотров с фоновым сбросом в БД"""
+
+    def __init__(self, flush_interval=None):
+        self._flush_interval = flush_interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def flush_interval(self):
+        if self._flush_interval is not None:
+            return self._flush_interval
+        return settings.POST_VIEWS_FLUSH_INTERVAL
+
+    def increment(self, post_id):
+        """Учитывает просмотр и возвращает число еще не сохраненных просмотров поста"""
+        from .models import Post
+
+        if self.flush_interval <= 0:
+            # Буферизация отключена - пишем сразу
+            Post.objects.filter(pk=post_id).update(views=F('views') + 1)
+            return 1
+
+        with self._lock:
+            self._pending[post_id] += 1
+            pending = self._pending[post_id]
+        self._ensure_started()
+        return pending
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def flush(self):
+        """Сбрасывает накопленные просмотры в БД, возвращает их количество"""
+        from .models import Post
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+
+        # Посты с одинаковым приростом обновляются одним запросом
+        posts_by_delta = defaultdict(list)
+        for post_id, delta in pending.items():
+            posts_by_delta[delta].append(post_id)
+
+        try:
+            with transaction.atomic():
+                for delta, post_ids in posts_by_delta.items():
+                    for start in range(0, len(post_ids), FLUSH_BATCH_SIZE):
+                        Post.objects.filter(
+                            pk__in=post_ids[start:start + FLUSH_BATCH_SIZE]
+                        ).update(views=F('views') + delta)
+        except Exception:
+            # Возвращаем просмотры в буфер, чтобы не потерять их
+            with self._lock:
+                self._pending.update(pending)
+            raise
+
+        return sum(pending.values())
+
+    def shutdown(self):
+        """Останавливает фоновый сброс и сохраняет остаток"""
+        self._stopped.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush post views on shutdown')
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='post-view-counter', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush post views')
+            finally:
+                # Фоновый поток не должен держать соединение между сбросами
+                connection.close()
+
+
+view_counter = ViewCounterBuffer()
+
+# При штатной остановке процесса сохраняем все накопленные просмотры
+atexit.register(view_counter.shutdown)